@@ -6,36 +6,255 @@ import json
 import os
 import sys
 import argparse
-from typing import Dict, Any, Optional
+import bisect
+import codecs
+import functools
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterator, Optional
 import datetime
 
 from wecare.utils.logger import setup_logging, get_logger
 from wecare.services.ai_service.product_analyzer import ProductAnalyzer
 from wecare.config import settings
 
-setup_logging()
 logger = get_logger(__name__)
 
+# Logging is configured on the first call to main() instead of at import, so
+# importing this module (e.g. from tests) does not install handlers.
+_LOG_READY = False
 
-def load_sample_product(product_file: Optional[str] = None) -> Dict[str, Any]:
-    """Load a sample product from a JSON file."""
-    if product_file and os.path.exists(product_file):
-        file_path = product_file
-    else:
-        # Use default sample product
-        sample_files = [f for f in os.listdir('.') if f.endswith('.json') and f[0].isdigit()]
-        if not sample_files:
-            logger.error("No sample product files found")
-            sys.exit(1)
-        file_path = sample_files[0]
-        logger.info(f"Using sample product: {file_path}")
+
+def _ensure_logging():
+    """Configure logging once per process."""
+    global _LOG_READY
+    if not _LOG_READY:
+        setup_logging()
+        _LOG_READY = True
+
+
+# Language prefix on Open Food Facts taxonomy tags (e.g. "en:e330")
+_OFF_TAG_PREFIX = "en:"
+
+# Display-side nutrition point tables: (ascending thresholds, points per bin).
+# bisect_right over the thresholds picks the bin, so a value equal to a
+# threshold falls into the upper bin.
+_BINS = {
+    "protein": ((2.5, 5.0), (0, 5, 10)),
+    "fat": ((5.0, 17.5), (10, 5, 0)),
+    "sugar": ((5.0, 22.5), (10, 5, 0)),
+    "fiber": ((3.0, 6.0), (0, 5, 10)),
+    "salt": ((0.3, 1.5), (10, 5, 0)),
+    "calories": ((200, 400), (10, 5, 0)),
+}
+
+
+def _pts(name: str, value: float) -> int:
+    """Look up the display points for a nutrient value."""
+    thresholds, points = _BINS[name]
+    return points[bisect.bisect_right(thresholds, value)]
+
+
+def _reference_set(product_data, key):
+    """Return the additive reference list ``key`` of ``product_data`` as a frozenset."""
+    return frozenset(product_data.get(key, ()) if product_data else ())
+
+
+def _classify_additives(additives, product_data=None):
+    """Classify additives as "safe", "suspicious" or "harmful".
+    
+    The reference lists from ``product_data`` are turned into frozensets once
+    per call, so classifying a whole additive list costs one hash lookup per
+    additive and category. Anything not flagged counts as safe, and an
+    additive on both lists is classified as harmful.
+    """
+    harmful_additives = _reference_set(product_data, "harmful_additives")
+    suspicious_additives = _reference_set(product_data, "suspicious_additives")
+    return [
+        "harmful" if additive in harmful_additives
+        else "suspicious" if additive in suspicious_additives
+        else "safe"
+        for additive in additives
+    ]
+
+
+def _count_additives(additives, classifications, product_data=None):
+    """Count safe, suspicious and harmful additives from their classifications.
+    
+    An additive on both the suspicious and the harmful list is classified as
+    harmful but counts towards both totals, as in the score breakdown.
+    
+    Returns:
+        Safe, suspicious and harmful counts
+    """
+    counts = Counter(classifications)
+    if counts["harmful"]:
+        suspicious_additives = _reference_set(product_data, "suspicious_additives")
+        counts["suspicious"] += sum(
+            1 for additive, safety in zip(additives, classifications)
+            if safety == "harmful" and additive in suspicious_additives
+        )
+    return counts["safe"], counts["suspicious"], counts["harmful"]
+
+
+@functools.lru_cache(maxsize=1)
+def _find_default_sample() -> Optional[str]:
+    """Find the first sample product file (digit-prefixed .json) in the working directory."""
+    with os.scandir('.') as entries:
+        for entry in entries:
+            name = entry.name
+            if name[0].isdigit() and name.endswith('.json') and entry.is_file():
+                return name
+    return None
+
+
+def _open_sample(product_file: Optional[str] = None) -> BinaryIO:
+    """Open the requested product file, falling back to the default sample."""
+    if product_file:
+        # Open directly rather than stat-ing first: one metadata round-trip
+        try:
+            return open(product_file, 'rb')
+        except FileNotFoundError:
+            pass
+    
+    # Use default sample product
+    file_path = _find_default_sample()
+    if file_path is None:
+        logger.error("No sample product files found")
+        sys.exit(1)
+    logger.info("Using sample product: %s", file_path)
+    return open(file_path, 'rb')
+
+
+# Shared decoder and whitespace scanner for product arrays
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+# Bytes read at a time when streaming an array
+_READ_SIZE = 1 << 16
+
+
+def _iter_json_array(f: BinaryIO, head: bytes) -> Iterator[Any]:
+    """Decode the items of a top-level JSON array one at a time.
+    
+    ``head`` holds the bytes already read from ``f``, starting with the
+    opening bracket. The rest of the file is read in chunks of _READ_SIZE
+    bytes as items are decoded, and decoded text is dropped once its item has
+    been yielded, so memory stays proportional to the largest product.
+    An item that is still incomplete is retried only after its pending text
+    has doubled, so a large item is decoded O(log n) times, not once per chunk.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = decoder.decode(head)
+    index = buffer.index("[") + 1
+    eof = False
+    
+    def read_more(size: int = 0) -> None:
+        """Append at least _READ_SIZE more bytes, dropping the text before ``index``."""
+        nonlocal buffer, index, eof
+        chunk = f.read(max(size, _READ_SIZE))
+        eof = not chunk
+        buffer = buffer[index:] + decoder.decode(chunk, final=eof)
+        index = 0
+    
+    def next_char() -> str:
+        """Skip whitespace, reading more as needed; return "" at end of file."""
+        nonlocal index
+        while True:
+            index = _skip_whitespace(buffer, index)
+            if index < len(buffer) or eof:
+                return buffer[index:index + 1]
+            read_more()
+    
+    if next_char() == "]":
+        return
+    while True:
+        while True:
+            try:
+                item, end = _JSON_DECODER.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more(len(buffer) - index)
+                continue
+            # An item ending exactly at the buffer end may continue in the
+            # next chunk (e.g. a number), so decode it again with more text
+            if end < len(buffer) or eof:
+                break
+            read_more(len(buffer) - index)
+        yield item
+        index = end
+        char = next_char()
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError("Expected ',' or ']' after an item in product array")
+        index += 1
+        next_char()
+
+
+def _skip_whitespace(text: str, index: int) -> int:
+    """Return the index of the next non-whitespace character."""
+    return _WHITESPACE.match(text, index).end()
+
+
+def iter_sample_products(product_file: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield products from a JSON document, a JSON array, or an NDJSON file.
+    
+    NDJSON files are decoded line by line and array items one at a time from
+    a chunked read, so only one decoded product is held in memory at once.
+    A single document is read and decoded whole.
     
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    Raises:
+        json.JSONDecodeError: If the file is empty or holds only whitespace
+    """
+    with _open_sample(product_file) as f:
+        first_line = f.readline()
+        while first_line and not first_line.strip():
+            first_line = f.readline()
+        
+        if first_line.lstrip().startswith(b"["):
+            # Top-level array of products
+            for data in _iter_json_array(f, first_line):
+                yield _normalize_product(data)
+            return
+        
+        try:
+            data = json.loads(first_line)
+        except ValueError:
+            # A (pretty-printed) single document spanning several lines.
+            # Parse straight from bytes: json.loads detects the encoding itself
+            # and skips the TextIOWrapper decoding layer of json.load(f).
+            yield _normalize_product(json.loads(first_line + f.read()))
+            return
+        
+        # One complete document per line (NDJSON, or a single-line document)
+        yield _normalize_product(data)
+        for line in f:
+            if line.strip():
+                yield _normalize_product(json.loads(line))
+
+
+def load_sample_product(product_file: Optional[str] = None) -> Dict[str, Any]:
+    """Load a sample product from a JSON file.
     
+    For files holding several products, the first one is returned.
+    """
+    for product_data in iter_sample_products(product_file):
+        return product_data
+    logger.error("No products found in sample file")
+    sys.exit(1)
+
+
+def _normalize_product(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a raw product record into the analyzer's input format."""
     product_data = {}
     
     if "product" in data:
+        # The whole record is serialized into the GPT prompt, so every field
+        # may inform the allergen and diet analysis; keep it as is, uncopied.
+        # Extracting only the scored fields would drop allergens_tags,
+        # ingredients and labels from the prompt, so it is deliberately not done
         product_data["product"] = data["product"]
         for field in ["code", "id"]:
             if field in data and field not in product_data:
@@ -70,120 +289,128 @@ def load_sample_product(product_file: Optional[str] = None) -> Dict[str, Any]:
     
     if "additives" not in product_data and "product" in product_data and "additives_tags" in product_data["product"]:
         product_data["additives"] = [
-            additive.replace("en:", "").upper() 
+            additive.removeprefix(_OFF_TAG_PREFIX).upper()
             for additive in product_data["product"]["additives_tags"]
         ]
     
     return product_data
 
 
+_COMPAT = "✅ Compatible"
+_INCOMPAT = "❌ Not Compatible"
+_ALLERGEN_WARNING = "\n⚠️ WARNING: Product contains allergens you're sensitive to!"
+
+
 def format_diet_compatibility(analysis):
     """Format diet compatibility results for display."""
-    result = []
-    for diet in analysis.diet_compatibility:
-        status = "✅ Compatible" if diet.compatible else "❌ Not Compatible"
-        result.append(f"{diet.diet}: {status}\n  Reason: {diet.reason}")
-    return "\n".join(result)
+    return "\n".join(
+        f"{diet.diet}: {_COMPAT if diet.compatible else _INCOMPAT}\n  Reason: {diet.reason}"
+        for diet in analysis.diet_compatibility
+    )
 
 
 def format_allergen_info(analysis):
     """Format allergen information for display."""
-    if not analysis.allergens_analysis.detected_allergens:
+    allergens = analysis.allergens_analysis
+    if not allergens.detected_allergens:
         return "No allergens detected"
     
-    result = ["Detected allergens:"]
-    for allergen in analysis.allergens_analysis.detected_allergens:
-        alert = "⚠️ " if allergen in analysis.allergens_analysis.user_allergens_present else "  "
-        result.append(f"{alert}{allergen}")
+    present = allergens.user_allergens_present
+    text = "Detected allergens:\n" + "\n".join(
+        f"{'⚠️ ' if allergen in present else '  '}{allergen}"
+        for allergen in allergens.detected_allergens
+    )
     
-    if analysis.allergens_analysis.user_allergens_present:
-        result.append("\n⚠️ WARNING: Product contains allergens you're sensitive to!")
+    if present:
+        text += "\n" + _ALLERGEN_WARNING
     
-    return "\n".join(result)
+    return text
 
 
-def display_results(analysis, scoring_method_used, product_data=None):
-    """Display product analysis results."""
+def display_results(analysis, scoring_method_used, product_data=None, out=None):
+    """Display product analysis results.
+    
+    Lines are collected and written to stdout in a single call. If ``out`` is
+    given, the lines are appended to it instead and nothing is written.
+    """
+    write = out is None
+    if write:
+        out = []
     product = analysis.product
     
-    print("\n" + "="*80)
-    print(f"PRODUCT ANALYSIS: {product.name}")
-    print("="*80)
+    out.append("\n" + "="*80)
+    out.append(f"PRODUCT ANALYSIS: {product.name}")
+    out.append("="*80)
     
     # Basic product info
-    print(f"\nProduct ID: {product.barcode}")
-    print(f"Manufacturer: {product.manufacturer}")
-    print(f"Weight: {product.weight.value} {product.weight.unit}")
+    out.append(f"\nProduct ID: {product.barcode}")
+    out.append(f"Manufacturer: {product.manufacturer}")
+    out.append(f"Weight: {product.weight.value} {product.weight.unit}")
     
     # Score information
     if product.score:
-        print(f"\nQUALITY SCORE: {product.score.total}/100 - {product.score.category}")
-        print(f"Nutrition Score: {product.score.nutrition_score}/100")
-        print(f"Additives Score: {product.score.additives_score}/100")
-        print(f"Scoring Method: {scoring_method_used}")
-        
-        # Add score calculation details
-        print("\nSCORE CALCULATION DETAILS:")
-        print("---------------------------")
-        print("Total Score Formula:")
-        print("  (Nutrition Score × 0.6) + (Additives Score × 0.4)")
-        print(f"  ({product.score.nutrition_score} × 0.6) + ({product.score.additives_score} × 0.4) = {product.score.total}")
+        out.append(f"\nQUALITY SCORE: {product.score.total}/100 - {product.score.category}")
+        out.append(f"Nutrition Score: {product.score.nutrition_score}/100")
+        out.append(f"Additives Score: {product.score.additives_score}/100")
+        out.append(f"Scoring Method: {scoring_method_used}")
         
         # Access the actual nutrition data from the product
         nutrition = product.nutrition
         
-        print("\nNutrition Score Calculation:")
-        print(f"  Actual values for {product.name}:")
-        print(f"  - Protein: {nutrition.protein}g/100g → {5 if 2.5 <= nutrition.protein < 5 else (10 if nutrition.protein >= 5 else 0)} points")
-        print(f"  - Fats: Total {nutrition.fat.total}g, Saturated {nutrition.fat.saturated}g → {5 if 5 <= nutrition.fat.total < 17.5 else (0 if nutrition.fat.total >= 17.5 else 10)} points")
-        print(f"  - Carbs: Total {nutrition.carbohydrates.total}g, Sugar {nutrition.carbohydrates.sugar}g → {5 if 5 <= nutrition.carbohydrates.sugar < 22.5 else (0 if nutrition.carbohydrates.sugar >= 22.5 else 10)} points")
-        print(f"  - Fiber: {nutrition.fiber}g/100g → {5 if 3 <= nutrition.fiber < 6 else (10 if nutrition.fiber >= 6 else 0)} points")
-        print(f"  - Salt: {nutrition.salt}g/100g → {5 if 0.3 <= nutrition.salt < 1.5 else (0 if nutrition.salt >= 1.5 else 10)} points")
-        print(f"  - Calories: {nutrition.calories}kcal/100g → {5 if 200 <= nutrition.calories < 400 else (0 if nutrition.calories >= 400 else 10)} points")
-        
-        # Calculate the estimated component points based on usual thresholds
-        protein_points = 5 if 2.5 <= nutrition.protein < 5 else (10 if nutrition.protein >= 5 else 0)
-        fat_points = 5 if 5 <= nutrition.fat.total < 17.5 else (0 if nutrition.fat.total >= 17.5 else 10)
-        carb_points = 5 if 5 <= nutrition.carbohydrates.sugar < 22.5 else (0 if nutrition.carbohydrates.sugar >= 22.5 else 10)
-        fiber_points = 5 if 3 <= nutrition.fiber < 6 else (10 if nutrition.fiber >= 6 else 0)
-        salt_points = 5 if 0.3 <= nutrition.salt < 1.5 else (0 if nutrition.salt >= 1.5 else 10)
-        calorie_points = 5 if 200 <= nutrition.calories < 400 else (0 if nutrition.calories >= 400 else 10)
+        # Score each nutrient once and reuse the points for both the listing and the breakdown
+        protein_points = _pts("protein", nutrition.protein)
+        fat_points = _pts("fat", nutrition.fat.total)
+        carb_points = _pts("sugar", nutrition.carbohydrates.sugar)
+        fiber_points = _pts("fiber", nutrition.fiber)
+        salt_points = _pts("salt", nutrition.salt)
+        calorie_points = _pts("calories", nutrition.calories)
         
         # Calculate the estimated score
-        estimated_score = ((protein_points * 0.2) + (fat_points * 0.2) + 
-                          (carb_points * 0.2) + (fiber_points * 0.1) + 
-                          (salt_points * 0.1) + (calorie_points * 0.2)) * 10
+        weighted_points = ((protein_points * 0.2) + (fat_points * 0.2) + 
+                           (carb_points * 0.2) + (fiber_points * 0.1) + 
+                           (salt_points * 0.1) + (calorie_points * 0.2))
+        estimated_score = weighted_points * 10
         
-        print(f"\n  Calculated breakdown (estimated):")
-        print(f"  (({protein_points}×0.2) + ({fat_points}×0.2) + ({carb_points}×0.2) + ({fiber_points}×0.1) + ({salt_points}×0.1) + ({calorie_points}×0.2)) × 10")
-        print(f"  = ({protein_points * 0.2 + fat_points * 0.2 + carb_points * 0.2 + fiber_points * 0.1 + salt_points * 0.1 + calorie_points * 0.2}) × 10")
-        print(f"  = {estimated_score:.1f} ≈ {round(estimated_score)}")
+        # Score calculation details, rendered as a single block
+        score = product.score
+        out.append(f"""
+SCORE CALCULATION DETAILS:
+---------------------------
+Total Score Formula:
+  (Nutrition Score × 0.6) + (Additives Score × 0.4)
+  ({score.nutrition_score} × 0.6) + ({score.additives_score} × 0.4) = {score.total}
+
+Nutrition Score Calculation:
+  Actual values for {product.name}:
+  - Protein: {nutrition.protein}g/100g → {protein_points} points
+  - Fats: Total {nutrition.fat.total}g, Saturated {nutrition.fat.saturated}g → {fat_points} points
+  - Carbs: Total {nutrition.carbohydrates.total}g, Sugar {nutrition.carbohydrates.sugar}g → {carb_points} points
+  - Fiber: {nutrition.fiber}g/100g → {fiber_points} points
+  - Salt: {nutrition.salt}g/100g → {salt_points} points
+  - Calories: {nutrition.calories}kcal/100g → {calorie_points} points
+
+  Calculated breakdown (estimated):
+  (({protein_points}×0.2) + ({fat_points}×0.2) + ({carb_points}×0.2) + ({fiber_points}×0.1) + ({salt_points}×0.1) + ({calorie_points}×0.2)) × 10
+  = ({weighted_points}) × 10
+  = {estimated_score:.1f} ≈ {round(estimated_score)}""")
         
-        print("\nAdditives Score Calculation:")
+        out.append("\nAdditives Score Calculation:")
         # Get additives from product
         additives = product.additives
-        print(f"  Additives found in {product.name}:")
+        out.append(f"  Additives found in {product.name}:")
+        
+        # Classify each additive once
+        classifications = _classify_additives(additives, product_data)
         
         # Display all additives with their safety classification
         if additives:
-            for additive in additives:
-                safety = "Safe"  # Default classification
-                if product_data and additive in product_data.get("harmful_additives", []):
-                    safety = "Harmful"
-                elif product_data and additive in product_data.get("suspicious_additives", []):
-                    safety = "Suspicious"
-                print(f"  - {additive}: {safety}")
+            for additive, safety in zip(additives, classifications):
+                out.append(f"  - {additive}: {safety.capitalize()}")
         else:
-            print("  - No additives found in this product")
+            out.append("  - No additives found in this product")
         
-        # Calculate safe, suspicious, harmful percentages
-        safe_additives = [] if not product_data else product_data.get("suspicious_additives", [])
-        suspicious_additives = [] if not product_data else product_data.get("suspicious_additives", [])
-        harmful_additives = [] if not product_data else product_data.get("harmful_additives", [])
-        
-        safe_count = sum(1 for a in additives if a not in suspicious_additives and a not in harmful_additives)
-        suspicious_count = sum(1 for a in additives if a in suspicious_additives)
-        harmful_count = sum(1 for a in additives if a in harmful_additives)
+        # Tally safe, suspicious, harmful counts in a single pass
+        safe_count, suspicious_count, harmful_count = _count_additives(additives, classifications, product_data)
         total_additives = max(1, len(additives))  # Avoid division by zero
         
         # Calculate the points (0-10 scale)
@@ -195,23 +422,26 @@ def display_results(analysis, scoring_method_used, product_data=None):
         additives_calc = (safe_points * 0.4) + (suspicious_points * 0.3) + (harmful_points * 0.3)
         estimated_additives_score = additives_calc * 10
         
-        print(f"\n  Additives score breakdown:")
-        print(f"  - Safe additives: {safe_count}/{total_additives} → {safe_points} points (40% weight)")
-        print(f"  - Suspicious additives: {suspicious_count}/{total_additives} → {suspicious_points} points (30% weight)")
-        print(f"  - Harmful additives: {harmful_count}/{total_additives} → {harmful_points} points (30% weight)")
-        print(f"  Formula: ({safe_points}×0.4 + {suspicious_points}×0.3 + {harmful_points}×0.3) × 10 = {estimated_additives_score}")
+        out.append(f"\n  Additives score breakdown:")
+        out.append(f"  - Safe additives: {safe_count}/{total_additives} → {safe_points} points (40% weight)")
+        out.append(f"  - Suspicious additives: {suspicious_count}/{total_additives} → {suspicious_points} points (30% weight)")
+        out.append(f"  - Harmful additives: {harmful_count}/{total_additives} → {harmful_points} points (30% weight)")
+        out.append(f"  Formula: ({safe_points}×0.4 + {suspicious_points}×0.3 + {harmful_points}×0.3) × 10 = {estimated_additives_score}")
     else:
-        print("\nQUALITY SCORE: Not available")
+        out.append("\nQUALITY SCORE: Not available")
     
     # Allergen information
-    print("\nALLERGEN INFORMATION:")
-    print(format_allergen_info(analysis))
+    out.append("\nALLERGEN INFORMATION:")
+    out.append(format_allergen_info(analysis))
     
     # Diet compatibility
-    print("\nDIET COMPATIBILITY:")
-    print(format_diet_compatibility(analysis))
+    out.append("\nDIET COMPATIBILITY:")
+    out.append(format_diet_compatibility(analysis))
+    
+    out.append("\n" + "="*80)
     
-    print("\n" + "="*80)
+    if write:
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 def parse_args():
@@ -248,32 +478,23 @@ def parse_args():
     return parser.parse_args()
 
 
+# Score block written when a product has no score
+_EMPTY_SCORE = {"total": 0, "category": "", "nutrition_score": 0, "additives_score": 0}
+
+
 def save_results_as_json(analysis, product_data, output_dir="results"):
     """Save analysis results as JSON according to the schema."""
     # Create results directory if it doesn't exist
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-        logger.info(f"Created results directory: {output_dir}")
+        logger.info("Created results directory: %s", output_dir)
     
     # Extract product additives with safety classifications
     additives = analysis.product.additives or []
-    ingredients = []
-    
-    safe_additives = [] if not product_data else product_data.get("safe_additives", [])
-    suspicious_additives = [] if not product_data else product_data.get("suspicious_additives", [])
-    harmful_additives = [] if not product_data else product_data.get("harmful_additives", [])
-    
-    for additive in additives:
-        safety = "safe"
-        if additive in harmful_additives:
-            safety = "harmful"
-        elif additive in suspicious_additives:
-            safety = "suspicious"
-        
-        ingredients.append({
-            "name": additive,
-            "safety": safety
-        })
+    ingredients = [
+        {"name": additive, "safety": safety}
+        for additive, safety in zip(additives, _classify_additives(additives, product_data))
+    ]
     
     # Build the result JSON
     result = {
@@ -282,47 +503,15 @@ def save_results_as_json(analysis, product_data, output_dir="results"):
             "barcode": getattr(analysis.product, "barcode", "") or product_data.get("code", ""),
             "name": getattr(analysis.product, "name", "") or product_data.get("product", {}).get("product_name", "Unknown"),
             "manufacturer": getattr(analysis.product, "manufacturer", "") or product_data.get("product", {}).get("brands", "Unknown"),
-            "weight": {
-                "value": getattr(analysis.product.weight, "value", 0) if hasattr(analysis.product, "weight") else 0,
-                "unit": getattr(analysis.product.weight, "unit", "g") if hasattr(analysis.product, "weight") else "g"
-            },
+            "weight": analysis.product.weight.to_dict(),
             "ingredients": ingredients,
-            "nutrition": {
-                "calories": getattr(analysis.product.nutrition, "calories", 0) if hasattr(analysis.product, "nutrition") else 0,
-                "protein": getattr(analysis.product.nutrition, "protein", 0) if hasattr(analysis.product, "nutrition") else 0,
-                "fat": {
-                    "total": getattr(analysis.product.nutrition.fat, "total", 0) if hasattr(analysis.product, "nutrition") and hasattr(analysis.product.nutrition, "fat") else 0,
-                    "saturated": getattr(analysis.product.nutrition.fat, "saturated", 0) if hasattr(analysis.product, "nutrition") and hasattr(analysis.product.nutrition, "fat") else 0
-                },
-                "carbohydrates": {
-                    "total": getattr(analysis.product.nutrition.carbohydrates, "total", 0) if hasattr(analysis.product, "nutrition") and hasattr(analysis.product.nutrition, "carbohydrates") else 0,
-                    "sugar": getattr(analysis.product.nutrition.carbohydrates, "sugar", 0) if hasattr(analysis.product, "nutrition") and hasattr(analysis.product.nutrition, "carbohydrates") else 0
-                },
-                "fiber": getattr(analysis.product.nutrition, "fiber", 0) if hasattr(analysis.product, "nutrition") else 0,
-                "salt": getattr(analysis.product.nutrition, "salt", 0) if hasattr(analysis.product, "nutrition") else 0,
-                "sodium": getattr(analysis.product.nutrition, "sodium", 0) if hasattr(analysis.product, "nutrition") else 0
-            },
-            "score": {
-                "total": getattr(analysis.product.score, "total", 0) if hasattr(analysis.product, "score") else 0,
-                "category": getattr(analysis.product.score, "category", "") if hasattr(analysis.product, "score") else "",
-                "nutrition_score": getattr(analysis.product.score, "nutrition_score", 0) if hasattr(analysis.product, "score") else 0,
-                "additives_score": getattr(analysis.product.score, "additives_score", 0) if hasattr(analysis.product, "score") else 0
-            },
+            "nutrition": analysis.product.nutrition.to_dict(),
+            "score": analysis.product.score.to_dict() if analysis.product.score else _EMPTY_SCORE.copy(),
             "additives": additives,
             "image_url": getattr(analysis.product, "image_url", "") or product_data.get("product", {}).get("image_url", "")
         },
-        "allergens_analysis": {
-            "detected_allergens": analysis.allergens_analysis.detected_allergens if hasattr(analysis, "allergens_analysis") and hasattr(analysis.allergens_analysis, "detected_allergens") else [],
-            "user_allergens_present": analysis.allergens_analysis.user_allergens_present if hasattr(analysis, "allergens_analysis") and hasattr(analysis.allergens_analysis, "user_allergens_present") else []
-        },
-        "diet_compatibility": [
-            {
-                "diet": diet.diet,
-                "compatible": diet.compatible,
-                "reason": diet.reason
-            }
-            for diet in analysis.diet_compatibility
-        ],
+        "allergens_analysis": analysis.allergens_analysis.to_dict(),
+        "diet_compatibility": [diet.to_dict() for diet in analysis.diet_compatibility],
         "scan_timestamp": datetime.datetime.now().isoformat()
     }
     
@@ -335,84 +524,105 @@ def save_results_as_json(analysis, product_data, output_dir="results"):
     with open(file_path, 'w') as f:
         json.dump(result, f, indent=2)
     
-    logger.info(f"Saved analysis results to: {file_path}")
+    logger.info("Saved analysis results to: %s", file_path)
     return file_path
 
 
+@functools.lru_cache(maxsize=1)
+def _get_analyzer() -> ProductAnalyzer:
+    """Create the product analyzer once per process.
+    
+    Call ``_get_analyzer.cache_clear()`` to force a new analyzer, e.g. after
+    changing the API key.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY", settings.OPENAI_API_KEY)
+    return ProductAnalyzer(api_key=api_key)
+
+
+def analyze_sample_product(analyzer, product_data, args):
+    """Analyze one loaded product, display the results and save them as JSON."""
+    product_name = product_data.get("product", {}).get("product_name", "Unknown")
+    logger.info("Loaded product: %s", product_name)
+    
+    use_ai_scoring = args.scoring in ["ai", "auto"]
+    scoring_method_used = "Not determined yet"
+    
+    has_external_score = "score" in product_data and product_data.get("score") is not None
+    
+    # Determine the actual scoring method based on arguments and data availability
+    if args.scoring == "external" or (args.scoring == "auto" and has_external_score):
+        # Force use of external score if available
+        if has_external_score:
+            use_ai_scoring = False
+            scoring_method_used = "External Score (provided with product data)"
+        else:
+            logger.warning("External score requested but not available. Using local scoring instead.")
+            use_ai_scoring = False
+            scoring_method_used = "Local Scoring Engine (fallback from external)"
+    elif args.scoring == "local":
+        use_ai_scoring = False
+        scoring_method_used = "Local Scoring Engine"
+    elif args.scoring == "ai":
+        use_ai_scoring = True
+        scoring_method_used = "AI-Generated Score (requested)"
+    else:  # auto
+        scoring_method_used = "Automatic Selection"
+    
+    # Analyze product
+    result = analyzer.analyze_product(
+        product_info=product_data,
+        user_allergens=args.allergens,
+        user_diets=args.diets,
+        use_ai_scoring=use_ai_scoring
+    )
+    logger.info("Product analysis completed successfully")
+    
+    # Check if fallback analysis was used (which indicates AI failed)
+    # (stops at the first diet entry that carries a real verdict)
+    ai_failed = not any(diet.compatible or "Unable to determine" not in diet.reason
+                        for diet in result.diet_compatibility)
+    
+    # Update the scoring method used based on the actual result
+    if has_external_score and scoring_method_used == "Automatic Selection":
+        scoring_method_used = "External Score (provided with product data)"
+    elif "AI-Generated" in scoring_method_used and ai_failed:
+        # AI was requested but failed
+        scoring_method_used = "Local Scoring Engine (fallback from AI error)"
+    elif scoring_method_used in ["Automatic Selection", "AI-Generated Score (requested)"] and result.product.score:
+        if use_ai_scoring and not ai_failed:
+            scoring_method_used = "AI-Generated Score"
+        else:
+            scoring_method_used = "Local Scoring Engine"
+    
+    # Display results
+    display_results(result, scoring_method_used, product_data)
+    
+    # Save results as JSON
+    json_path = save_results_as_json(result, product_data)
+    print(f"\nAnalysis results saved to: {json_path}")
+
+
 def main():
     """Run the main application pipeline."""
+    _ensure_logging()
     try:
         logger.info("Starting WeCare product analysis pipeline")
         
         args = parse_args()
         
-        use_ai_scoring = args.scoring in ["ai", "auto"]
-        scoring_method_used = "Not determined yet"
-        
-        product_data = load_sample_product(args.product_file)
-        product_name = product_data.get("product", {}).get("product_name", "Unknown")
-        logger.info(f"Loaded product: {product_name}")
-        
-        api_key = os.environ.get("OPENAI_API_KEY", settings.OPENAI_API_KEY)
-        analyzer = ProductAnalyzer(api_key=api_key)
-        logger.info("Initialized product analyzer")
-        
-        has_external_score = "score" in product_data and product_data.get("score") is not None
-        
-        # Determine the actual scoring method based on arguments and data availability
-        if args.scoring == "external" or (args.scoring == "auto" and has_external_score):
-            # Force use of external score if available
-            if has_external_score:
-                use_ai_scoring = False
-                scoring_method_used = "External Score (provided with product data)"
-            else:
-                logger.warning("External score requested but not available. Using local scoring instead.")
-                use_ai_scoring = False
-                scoring_method_used = "Local Scoring Engine (fallback from external)"
-        elif args.scoring == "local":
-            use_ai_scoring = False
-            scoring_method_used = "Local Scoring Engine"
-        elif args.scoring == "ai":
-            use_ai_scoring = True
-            scoring_method_used = "AI-Generated Score (requested)"
-        else:  # auto
-            scoring_method_used = "Automatic Selection"
-        
-        # Analyze product
-        result = analyzer.analyze_product(
-            product_info=product_data,
-            user_allergens=args.allergens,
-            user_diets=args.diets,
-            use_ai_scoring=use_ai_scoring
-        )
-        logger.info("Product analysis completed successfully")
-        
-        # Check if fallback analysis was used (which indicates AI failed)
-        ai_failed = all(not diet.compatible and "Unable to determine" in diet.reason 
-                       for diet in result.diet_compatibility)
-        
-        # Update the scoring method used based on the actual result
-        if has_external_score and scoring_method_used == "Automatic Selection":
-            scoring_method_used = "External Score (provided with product data)"
-        elif "AI-Generated" in scoring_method_used and ai_failed:
-            # AI was requested but failed
-            scoring_method_used = "Local Scoring Engine (fallback from AI error)"
-        elif scoring_method_used in ["Automatic Selection", "AI-Generated Score (requested)"] and result.product.score:
-            if use_ai_scoring and not ai_failed:
-                scoring_method_used = "AI-Generated Score"
-            else:
-                scoring_method_used = "Local Scoring Engine"
-        
-        # Display results
-        display_results(result, scoring_method_used, product_data)
-        
-        # Save results as JSON
-        json_path = save_results_as_json(result, product_data)
-        print(f"\nAnalysis results saved to: {json_path}")
+        # Build the analyzer in the background while the product file is read
+        # and parsed; the two are independent, so the shorter one is hidden.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            analyzer_future = executor.submit(_get_analyzer)
+            
+            # Products are streamed from the file and analyzed one at a time
+            for product_data in iter_sample_products(args.product_file):
+                analyzer = analyzer_future.result()
+                analyze_sample_product(analyzer, product_data, args)
         
         return 0
     except Exception as e:
-        logger.error(f"Error in WeCare pipeline: {str(e)}", exc_info=True)
+        logger.error("Error in WeCare pipeline: %s", e, exc_info=True)
         return 1
 
 
@@ -1,6 +1,7 @@
 """Pytest configuration and shared fixtures."""
 import json
 import os
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 import pytest
 
@@ -10,6 +11,33 @@ from wecare.core.models.schemas import (
 )
 
 
+# Serialized once at import; the mock response fixtures share this literal
+_MOCK_AI_CONTENT = json.dumps({
+    "allergens_analysis": {
+        "detected_allergens": ["Peanuts", "Soybeans"],
+        "user_allergens_present": ["Peanuts"]
+    },
+    "diet_compatibility": [
+        {
+            "diet": "Vegetarian",
+            "compatible": True,
+            "reason": "Contains no meat products"
+        },
+        {
+            "diet": "Low-Sugar",
+            "compatible": False,
+            "reason": "Contains 13.46g of sugar per 100g, which exceeds the limit for a low-sugar diet"
+        }
+    ],
+    "score": {
+        "total": 75,
+        "category": "Good",
+        "nutrition_score": 80,
+        "additives_score": 70
+    }
+})
+
+
 @pytest.fixture
 def sample_product_data():
     """Fixture providing sample product data."""
@@ -68,7 +96,33 @@ def sample_nutrition_data():
     }
 
 
+@pytest.fixture(scope="session")
+def additive_refs():
+    """Fixture providing the additive reference lists used for scoring."""
+    return {
+        "safe_additives": ("E300", "E306", "E330"),
+        "suspicious_additives": ("E102", "E104"),
+        "harmful_additives": ("E211", "E250")
+    }
+
+
 @pytest.fixture
+def base_nutrition():
+    """Fixture providing nutrition data that scores 90 of 100."""
+    return {
+        "calories": 350,  # Medium: 5 points
+        "protein": 8.5,  # High: 10 points
+        "fat": {"total": 10.5, "saturated": 1.2},  # Low sat. fat: 10 points
+        "carbohydrates": {"total": 45.0, "sugar": 4.5},  # Low sugar: 10 points
+        "fiber": 6.5,  # High fiber: 10 points
+        "salt": 0.2,  # Low salt: 10 points
+        "sodium": 0.1
+    }
+
+
+# The model fixtures below are built once per session and shared by every
+# test, so tests must treat them as read-only
+@pytest.fixture(scope="session")
 def sample_score():
     """Fixture providing a sample score object."""
     return Score(
@@ -79,7 +133,7 @@ def sample_score():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_product_info(sample_score):
     """Fixture providing a sample ProductInfo object."""
     return ProductInfo(
@@ -104,7 +158,7 @@ def sample_product_info(sample_score):
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_allergen_analysis():
     """Fixture providing a sample AllergenAnalysis object."""
     return AllergenAnalysis(
@@ -113,7 +167,7 @@ def sample_allergen_analysis():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_diet_compatibility():
     """Fixture providing sample DietCompatibility objects."""
     return [
@@ -130,7 +184,7 @@ def sample_diet_compatibility():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_product_analysis(sample_product_info, sample_allergen_analysis, sample_diet_compatibility):
     """Fixture providing a sample ProductAnalysis object."""
     return ProductAnalysis(
@@ -140,43 +194,11 @@ def sample_product_analysis(sample_product_info, sample_allergen_analysis, sampl
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_openai_response():
     """Fixture providing a mock OpenAI API response."""
-    class MockResponse:
-        def __init__(self):
-            self.choices = [
-                MagicMock(
-                    message=MagicMock(
-                        content=json.dumps({
-                            "allergens_analysis": {
-                                "detected_allergens": ["Peanuts", "Soybeans"],
-                                "user_allergens_present": ["Peanuts"]
-                            },
-                            "diet_compatibility": [
-                                {
-                                    "diet": "Vegetarian",
-                                    "compatible": True,
-                                    "reason": "Contains no meat products"
-                                },
-                                {
-                                    "diet": "Low-Sugar",
-                                    "compatible": False,
-                                    "reason": "Contains 13.46g of sugar per 100g, which exceeds the limit for a low-sugar diet"
-                                }
-                            ],
-                            "score": {
-                                "total": 75,
-                                "category": "Good",
-                                "nutrition_score": 80,
-                                "additives_score": 70
-                            }
-                        })
-                    )
-                )
-            ]
-    
-    return MockResponse()
+    # Plain namespaces mirror the response shape without MagicMock's overhead
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=_MOCK_AI_CONTENT))])
 
 
 @pytest.fixture
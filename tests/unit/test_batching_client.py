@@ -0,0 +1,148 @@
+"""Unit tests for the batching GPT client."""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from wecare.services.ai_service.batching_client import BatchingGPTClient
+from wecare.core.models.schemas import AIServiceInput
+
+
+def make_response(results):
+    """Create a chat completion response carrying the given content."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(results)))])
+
+
+def make_result(allergen):
+    """Create one decoded analysis object."""
+    return {
+        "allergens_analysis": {"detected_allergens": [allergen], "user_allergens_present": []},
+        "diet_compatibility": [{"diet": "Vegan", "compatible": True, "reason": "No animal products"}]
+    }
+
+
+def make_input(name, user_diets=("Vegan",)):
+    """Create an AI service input for the given product name."""
+    return AIServiceInput(
+        product_info={"name": name},
+        user_allergens=["Peanuts"],
+        user_diets=list(user_diets),
+        calculate_score=False
+    )
+
+
+@pytest.fixture
+def mock_async_client():
+    """Create a mock AsyncOpenAI client."""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def batching_client(mock_async_client):
+    """Create a batching client using the mock AsyncOpenAI client."""
+    with patch("wecare.services.ai_service.gpt_client.AsyncOpenAI", return_value=mock_async_client):
+        yield BatchingGPTClient(api_key="test_key", max_batch=2, max_wait_ms=1)
+
+
+class TestBatchingGPTClient:
+    """Test suite for the batching GPT client."""
+
+    def test_concurrent_requests_share_one_call(self, batching_client, mock_async_client):
+        """Test that concurrent analyses are sent as one batched request."""
+        mock_async_client.chat.completions.create.return_value = make_response(
+            {"results": [make_result("Soy"), make_result("Milk")]}
+        )
+
+        async def analyze():
+            return await asyncio.gather(
+                batching_client.aanalyze_product(make_input("A")),
+                batching_client.aanalyze_product(make_input("B"))
+            )
+
+        first, second = asyncio.run(analyze())
+
+        mock_async_client.chat.completions.create.assert_awaited_once()
+        prompt = mock_async_client.chat.completions.create.call_args[1]["messages"][1]["content"]
+        assert '"results"' in prompt
+        assert prompt.index('"A"') < prompt.index('"B"')
+        assert first.allergens_analysis.detected_allergens == ["Soy"]
+        assert second.allergens_analysis.detected_allergens == ["Milk"]
+        assert first.score is None
+
+    def test_different_preferences_are_not_batched(self, batching_client, mock_async_client):
+        """Test that requests with different preferences use separate calls."""
+        mock_async_client.chat.completions.create.return_value = make_response(make_result("Soy"))
+
+        async def analyze():
+            return await asyncio.gather(
+                batching_client.aanalyze_product(make_input("A")),
+                batching_client.aanalyze_product(make_input("B", user_diets=["Keto"]))
+            )
+
+        results = asyncio.run(analyze())
+
+        assert mock_async_client.chat.completions.create.await_count == 2
+        assert all(result.allergens_analysis.detected_allergens == ["Soy"] for result in results)
+
+    def test_batch_errors_reach_every_caller(self, batching_client, mock_async_client):
+        """Test that a malformed batched response fails all of its requests."""
+        mock_async_client.chat.completions.create.return_value = make_response(
+            {"results": [make_result("Soy")]}
+        )
+
+        async def analyze():
+            return await asyncio.gather(
+                batching_client.aanalyze_product(make_input("A")),
+                batching_client.aanalyze_product(make_input("B")),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(analyze())
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert "Expected 2 results" in str(results[0])
+
+    def test_identical_requests_are_sent_once(self, batching_client, mock_async_client):
+        """Test that identical concurrent requests share one analysis."""
+        mock_async_client.chat.completions.create.return_value = make_response(make_result("Soy"))
+
+        async def analyze():
+            return await asyncio.gather(
+                batching_client.aanalyze_product(make_input("A")),
+                batching_client.aanalyze_product(make_input("A"))
+            )
+
+        first, second = asyncio.run(analyze())
+
+        mock_async_client.chat.completions.create.assert_awaited_once()
+        prompt = mock_async_client.chat.completions.create.call_args[1]["messages"][1]["content"]
+        assert '"results"' not in prompt
+        assert first == second
+        assert first is not second
+        assert not batching_client._inflight
+
+    def test_batches_follow_prompt_size_limits(self, batching_client, mock_async_client):
+        """Test that a flushed batch is split like the sync batch path."""
+        mock_async_client.chat.completions.create.return_value = make_response(make_result("Soy"))
+        batching_client.MAX_BATCH_PRODUCTS = 1
+
+        async def analyze():
+            return await asyncio.gather(
+                batching_client.aanalyze_product(make_input("A")),
+                batching_client.aanalyze_product(make_input("B"))
+            )
+
+        results = asyncio.run(analyze())
+
+        assert mock_async_client.chat.completions.create.await_count == 2
+        assert all(result.allergens_analysis.detected_allergens == ["Soy"] for result in results)
+
+    def test_max_batch_is_capped(self, mock_async_client):
+        """Test that a flush never holds more products than one prompt may carry."""
+        with patch("wecare.services.ai_service.gpt_client.AsyncOpenAI", return_value=mock_async_client):
+            assert BatchingGPTClient(api_key="test_key").max_batch == BatchingGPTClient.MAX_BATCH_PRODUCTS
+            assert BatchingGPTClient(api_key="test_key", max_batch=64).max_batch == BatchingGPTClient.MAX_BATCH_PRODUCTS
+            assert BatchingGPTClient(api_key="test_key", max_batch=2).max_batch == 2
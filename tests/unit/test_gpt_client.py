@@ -1,18 +1,20 @@
 """Unit tests for the GPT client."""
+import asyncio
+import hashlib
 import json
 import pytest
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from wecare.config import settings
 from wecare.services.ai_service.gpt_client import GPTClient
+from wecare.services.ai_service.response_cache import ResponseCache
 from wecare.core.models.schemas import AIServiceInput
 
 
-@pytest.fixture
-def mock_openai_client():
-    """Create a mock OpenAI client for testing."""
-    client = MagicMock()
-    
-    # Create a mock response
+@pytest.fixture(scope="module")
+def mock_openai_response():
+    """Create a mock OpenAI response for testing."""
     mock_response = MagicMock()
     mock_choice = MagicMock()
     mock_message = MagicMock()
@@ -46,15 +48,24 @@ def mock_openai_client():
     mock_message.content = json.dumps(response_content)
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
-    client.chat.completions.create.return_value = mock_response
     
-    return client
+    return mock_response
+
+
+@pytest.fixture(scope="module")
+def shared_openai_client():
+    """Create the mock OpenAI client shared by the tests in this module."""
+    return MagicMock()
 
 
 @pytest.fixture
-def mock_openai_response(mock_openai_client):
-    """Return the mock response from the OpenAI client."""
-    return mock_openai_client.chat.completions.create.return_value
+def mock_openai_client(shared_openai_client, mock_openai_response):
+    """Reset the shared mock OpenAI client for a test."""
+    shared_openai_client.reset_mock()
+    create = shared_openai_client.chat.completions.create
+    create.side_effect = None
+    create.return_value = mock_openai_response
+    return shared_openai_client
 
 
 class TestGPTClient:
@@ -88,6 +99,14 @@ class TestGPTClient:
         assert client.base_url == "https://custom-url.example.com"
         assert client.guided_json == guided_json
         mock_openai.assert_called_once()
+
+        # The schema is serialized once and unaffected by later changes
+        schema_str = client._guided_json_str
+        guided_json["custom"] = "changed"
+        assert client._guided_json_str == schema_str
+        assert schema_str in client._create_prompt(AIServiceInput(
+            product_info={}, user_allergens=[], user_diets=[]
+        ))
         
     @patch("wecare.services.ai_service.gpt_client.OpenAI")
     def test_initialization_missing_api_key(self, mock_openai):
@@ -115,7 +134,7 @@ class TestGPTClient:
         # Check that the prompt contains the expected elements
         assert "Test Product" in prompt
         assert "Peanuts, Shellfish" in prompt
-        assert "Vegetarian, Low-Sugar" in prompt
+        assert "Low-Sugar, Vegetarian" in prompt
         assert "Calculate a product quality score" in prompt
         assert "schema" in prompt
 
@@ -136,6 +155,66 @@ class TestGPTClient:
         assert "Calculate a product quality score" not in prompt
         assert "schema" in prompt
 
+    def test_create_prompt_shares_static_prefix(self):
+        """Test that request data never precedes the static instructions."""
+        client = GPTClient(api_key="test_key")
+        scored = client._create_prompt(AIServiceInput(
+            product_info={"name": "Test Product"},
+            user_allergens=["Shellfish", "Peanuts"],
+            user_diets=["Vegan"],
+            calculate_score=True
+        ))
+        unscored = client._create_prompt(AIServiceInput(
+            product_info={"name": "Other Product"},
+            user_allergens=[],
+            user_diets=[],
+            calculate_score=False
+        ))
+
+        prefix = scored[:scored.index("SCORE REQUESTED:")]
+        assert unscored.startswith(prefix)
+        assert "Test Product" not in prefix
+        assert "Peanuts, Shellfish" in scored
+
+    def test_prompt_static_prefix_stable(self):
+        """Test that the cacheable prompt prefix is byte-identical and pinned.
+        
+        The provider's prompt cache only matches an exact prefix. If this test
+        fails after an intentional prompt change, update the pinned digest.
+        """
+        prompts = [
+            GPTClient(api_key="test_key")._create_prompt(input_data)
+            for input_data in (
+                AIServiceInput(
+                    product_info={"name": "Test Product", "ingredients": ["Sugar"]},
+                    user_allergens=["Peanuts"],
+                    user_diets=["Vegan"],
+                    calculate_score=True
+                ),
+                AIServiceInput(
+                    product_info={"name": "Other Product"},
+                    user_allergens=[],
+                    user_diets=["Keto"],
+                    calculate_score=False
+                )
+            )
+        ]
+        prefix = GPTClient(api_key="test_key")._prompt_prefix
+        
+        assert all(prompt[:len(prefix)] == prefix for prompt in prompts)
+        assert hashlib.blake2b(prefix.encode("utf-8"), digest_size=16).hexdigest() == "c03d1c1b1056ebe559736ef4c9f0eb34"
+
+    def test_create_prompt_serializes_sets(self):
+        """Test that set values in product info are rendered as sorted lists."""
+        client = GPTClient(api_key="test_key")
+        prompt = client._create_prompt(AIServiceInput(
+            product_info={"name": "Test Product", "labels": {"vegan", "organic"}},
+            user_allergens=[],
+            user_diets=[]
+        ))
+        
+        assert '"labels":["organic","vegan"]' in prompt
+
     def test_analyze_product(self, mock_openai_client):
         """Test product analysis with mocked OpenAI client."""
         with patch("wecare.services.ai_service.gpt_client.OpenAI", return_value=mock_openai_client):
@@ -160,6 +239,7 @@ class TestGPTClient:
             assert call_args["messages"][0]["role"] == "system"
             assert call_args["messages"][1]["role"] == "user"
             assert call_args["response_format"] == {"type": "json_object"}
+            assert call_args["temperature"] == 0
             
             # Verify the result structure
             assert result.allergens_analysis.detected_allergens == ["Peanuts", "Soybeans"]
@@ -272,4 +352,266 @@ class TestGPTClient:
             assert result.diet_compatibility[0].compatible is True
             assert result.diet_compatibility[1].diet == "Low-Sugar"
             assert result.diet_compatibility[1].compatible is False
-            assert result.score is None 
\ No newline at end of file
+            assert result.score is None
+
+    def test_aanalyze_product(self, mock_openai_response):
+        """Test asynchronous product analysis with a mocked AsyncOpenAI client."""
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock(return_value=mock_openai_response)
+        
+        with patch("wecare.services.ai_service.gpt_client.AsyncOpenAI", return_value=mock_async_client):
+            client = GPTClient(api_key="test_key")
+            
+            inputs = [
+                AIServiceInput(
+                    product_info={"name": name, "ingredients": ["Sugar", "Water"]},
+                    user_allergens=["Peanuts"],
+                    user_diets=["Vegetarian", "Low-Sugar"],
+                    calculate_score=True
+                )
+                for name in ("Test Product", "Other Product")
+            ]
+            
+            async def analyze_two():
+                return await asyncio.gather(*(client.aanalyze_product(item) for item in inputs))
+            
+            results = asyncio.run(analyze_two())
+            
+            assert mock_async_client.chat.completions.create.await_count == 2
+            call_args = mock_async_client.chat.completions.create.call_args[1]
+            assert call_args["response_format"] == {"type": "json_object"}
+            assert all(result.score.total == 75 for result in results)
+
+    @patch("wecare.services.ai_service.gpt_client.OpenAI")
+    def test_get_shared(self, mock_openai):
+        """Test that shared clients are reused per set of credentials."""
+        first = GPTClient.get_shared(api_key="shared_key")
+        assert GPTClient.get_shared(api_key="shared_key") is first
+        assert GPTClient.get_shared(api_key="other_key") is not first
+        assert GPTClient.get_shared(api_key="shared_key", guided_json={"custom": "template"}) is not first
+
+    @patch("wecare.services.ai_service.gpt_client.AsyncOpenAI")
+    @patch("wecare.services.ai_service.gpt_client.OpenAI")
+    def test_async_client_is_created_lazily(self, mock_openai, mock_async_openai):
+        """Test that the async client is only built on first async use."""
+        client = GPTClient(api_key="test_key")
+        mock_async_openai.assert_not_called()
+
+        assert client.async_client is client.async_client
+        mock_async_openai.assert_called_once()
+        assert mock_async_openai.call_args.kwargs["max_retries"] == settings.OPENAI_MAX_RETRIES
+
+    @patch("wecare.services.ai_service.gpt_client.OpenAI")
+    def test_clients_share_http_pool(self, mock_openai):
+        """Test that separate clients reuse one HTTP connection pool."""
+        GPTClient(api_key="test_key")
+        GPTClient(api_key="other_key", base_url="https://other.example.com")
+
+        first, second = (call.kwargs["http_client"] for call in mock_openai.call_args_list)
+        assert first is second
+        assert mock_openai.call_args.kwargs["max_retries"] == settings.OPENAI_MAX_RETRIES
+
+    def test_closing_one_client_keeps_shared_pool_open(self):
+        """Test that closing one client leaves the shared pool working for the others."""
+        first = GPTClient(api_key="test_key")
+        second = GPTClient(api_key="other_key")
+
+        first.client.close()
+        with first.client:
+            pass
+
+        assert not second.client.is_closed()
+        assert not GPTClient(api_key="third_key").client.is_closed()
+
+    def test_analyze_product_uses_response_cache(self, mock_openai_client):
+        """Test that repeated requests are answered from the response cache."""
+        with patch("wecare.services.ai_service.gpt_client.OpenAI", return_value=mock_openai_client):
+            client = GPTClient(api_key="test_key")
+            
+            first = client.analyze_product(AIServiceInput(
+                product_info={"name": "Test Product", "ingredients": ["Sugar", "Water"]},
+                user_allergens=["Peanuts", "Milk"],
+                user_diets=["Vegetarian"],
+                calculate_score=True
+            ))
+            # Same request with the preferences in a different order
+            second = client.analyze_product(AIServiceInput(
+                product_info={"ingredients": ["Sugar", "Water"], "name": "Test Product"},
+                user_allergens=["Milk", "Peanuts"],
+                user_diets=["Vegetarian"],
+                calculate_score=True
+            ))
+            
+            mock_openai_client.chat.completions.create.assert_called_once()
+            assert second == first
+            assert second is not first
+            assert client.response_cache.hits == 1
+            assert client.response_cache.misses == 1
+
+    def test_analyze_products_batches_shared_preferences(self, mock_openai_client):
+        """Test that products with the same preferences share one request."""
+        result = {
+            "allergens_analysis": {"detected_allergens": ["Soy"], "user_allergens_present": []},
+            "diet_compatibility": [{"diet": "Vegan", "compatible": True, "reason": "No animal products"}]
+        }
+        mock_openai_client.chat.completions.create.return_value = SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=json.dumps({"results": [result, result]})))
+        ])
+
+        def make_input(name):
+            return AIServiceInput(
+                product_info={"name": name},
+                user_allergens=["Peanuts"],
+                user_diets=["Vegan"],
+                calculate_score=False
+            )
+
+        with patch("wecare.services.ai_service.gpt_client.OpenAI", return_value=mock_openai_client):
+            client = GPTClient(api_key="test_key")
+
+            # The repeated product is sent once and answered for both positions
+            outputs = client.analyze_products([make_input("A"), make_input("B"), make_input("A")])
+
+            mock_openai_client.chat.completions.create.assert_called_once()
+            prompt = mock_openai_client.chat.completions.create.call_args[1]["messages"][1]["content"]
+            assert '"results"' in prompt
+            assert len(outputs) == 3
+            assert outputs[0] == outputs[2]
+            assert outputs[0] is not outputs[2]
+            assert outputs[1].allergens_analysis.detected_allergens == ["Soy"]
+
+            # Product data over the size limit is split across requests
+            mock_openai_client.chat.completions.create.return_value = SimpleNamespace(choices=[
+                SimpleNamespace(message=SimpleNamespace(content=json.dumps(result)))
+            ])
+            client.MAX_BATCH_CHARS = 10
+            client.analyze_products([make_input("C"), make_input("D")])
+
+            assert mock_openai_client.chat.completions.create.call_count == 3
+
+            # So is a batch with more products than MAX_BATCH_PRODUCTS
+            client.MAX_BATCH_CHARS = GPTClient.MAX_BATCH_CHARS
+            client.MAX_BATCH_PRODUCTS = 1
+            client.analyze_products([make_input("E"), make_input("F")])
+
+            assert mock_openai_client.chat.completions.create.call_count == 5
+
+    def test_submit_batch(self, mock_openai_client, mock_openai_response):
+        """Test that a Batch API job is submitted, polled and mapped back to inputs."""
+        content = mock_openai_response.choices[0].message.content
+        client_api = mock_openai_client
+        client_api.files.create.return_value = SimpleNamespace(id="file-in")
+        client_api.batches.create.return_value = SimpleNamespace(id="batch-1")
+        completed = SimpleNamespace(status="completed", output_file_id="file-out")
+        client_api.batches.retrieve.side_effect = [
+            SimpleNamespace(status="in_progress"), completed, completed
+        ]
+
+        inputs = [
+            AIServiceInput(product_info={"name": name}, user_allergens=["Peanuts"], user_diets=[], calculate_score=True)
+            for name in ("A", "B", "A")
+        ]
+        keys = [ResponseCache.make_key(input_data, settings.OPENAI_MODEL).hex() for input_data in inputs[:2]]
+        # Results may come back in any order
+        client_api.files.content.return_value = SimpleNamespace(text="\n".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+                "error": None
+            })
+            for custom_id in reversed(keys)
+        ))
+
+        with patch("wecare.services.ai_service.gpt_client.OpenAI", return_value=client_api):
+            client = GPTClient(api_key="test_key")
+            outputs = client.submit_batch(inputs, poll_interval=0)
+
+            upload = client_api.files.create.call_args[1]
+            assert upload["purpose"] == "batch"
+            lines = upload["file"][1].decode("utf-8").splitlines()
+            assert [json.loads(line)["custom_id"] for line in lines] == keys
+            assert client_api.batches.retrieve.call_count == 3
+            assert all(output.score.total == 75 for output in outputs)
+            assert outputs[0] == outputs[2]
+
+            # Answered from the response cache without a new job
+            assert client.submit_batch(inputs[:1]) == outputs[:1]
+            client_api.batches.create.assert_called_once()
+
+            client_api.batches.retrieve.side_effect = None
+            client_api.batches.retrieve.return_value = SimpleNamespace(status="failed")
+            with pytest.raises(RuntimeError):
+                client.submit_batch([AIServiceInput(
+                    product_info={"name": "C"}, user_allergens=[], user_diets=[], calculate_score=True
+                )], poll_interval=0)
+
+    def test_start_and_fetch_batch(self, mock_openai_client, mock_openai_response):
+        """Test that batch results can be collected later into the response cache."""
+        content = mock_openai_response.choices[0].message.content
+        client_api = mock_openai_client
+        client_api.files.create.return_value = SimpleNamespace(id="file-in")
+        client_api.batches.create.return_value = SimpleNamespace(id="batch-1")
+        input_data = AIServiceInput(
+            product_info={"name": "A"}, user_allergens=["Peanuts"], user_diets=[], calculate_score=True
+        )
+        client_api.files.content.return_value = SimpleNamespace(text=json.dumps({
+            "custom_id": ResponseCache.make_key(input_data, settings.OPENAI_MODEL).hex(),
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+            "error": None
+        }))
+
+        with patch("wecare.services.ai_service.gpt_client.OpenAI", return_value=client_api):
+            client = GPTClient(api_key="test_key")
+            assert client.start_batch([input_data]) == "batch-1"
+
+            client_api.batches.retrieve.return_value = SimpleNamespace(status="in_progress")
+            with pytest.raises(RuntimeError):
+                client.fetch_batch_results("batch-1")
+
+            client_api.batches.retrieve.return_value = SimpleNamespace(status="completed", output_file_id="file-out")
+            assert len(client.fetch_batch_results("batch-1")) == 1
+
+            # Fetched results answer later requests without another job
+            assert client.start_batch([input_data]) is None
+            assert client.analyze_product(input_data).score.total == 75
+            client_api.chat.completions.create.assert_not_called()
+
+    def test_stream_analyze_product(self, mock_openai_response):
+        """Test that streamed fields are yielded as soon as they are complete."""
+        content = mock_openai_response.choices[0].message.content
+        chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 7]))])
+            for i in range(0, len(content), 7)
+        ]
+        
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock(return_value=stream())
+        
+        with patch("wecare.services.ai_service.gpt_client.AsyncOpenAI", return_value=mock_async_client):
+            client = GPTClient(api_key="test_key")
+            input_data = AIServiceInput(
+                product_info={"name": "Test Product"},
+                user_allergens=["Peanuts"],
+                user_diets=["Vegetarian", "Low-Sugar"],
+                calculate_score=True
+            )
+            
+            async def collect():
+                return [item async for item in client.stream_analyze_product(input_data)]
+            
+            fields = asyncio.run(collect())
+            
+            assert mock_async_client.chat.completions.create.call_args[1]["stream"] is True
+            assert [name for name, _ in fields] == ["allergens_analysis", "diet_compatibility", "score"]
+            assert fields[0][1].detected_allergens == ["Peanuts", "Soybeans"]
+            assert fields[1][1][1].diet == "Low-Sugar"
+            assert fields[2][1].total == 75
+            
+            # The collected analysis is cached for later requests
+            cached = asyncio.run(collect())
+            assert cached == fields
+            mock_async_client.chat.completions.create.assert_awaited_once()
@@ -0,0 +1,120 @@
+"""Unit tests for the sample product loading in the main entry point."""
+import json
+import pytest
+
+import main
+
+
+def make_off_record():
+    """Create an Open Food Facts record with allergen and analysis fields."""
+    return {
+        "code": "0737628064502",
+        "product": {
+            "product_name": "Thai peanut noodle kit",
+            "allergens": "en:peanuts",
+            "allergens_hierarchy": ["en:peanuts", "en:soybeans"],
+            "allergens_tags": ["en:peanuts", "en:soybeans"],
+            "ingredients_analysis_tags": ["en:palm-oil-free", "en:vegan"],
+            "nova_group": 4,
+            "nutriscore_grade": "d",
+            "additives_tags": ["en:e330"],
+            "nutriments": {"energy-kcal_100g": 385, "fat_100g": 7.69, "vitamin-c_100g": 0.001}
+        }
+    }
+
+
+class TestSampleProducts:
+    """Test suite for loading sample product files."""
+
+    def test_off_record_keeps_analysis_fields(self, tmp_path):
+        """Test that every field of an OFF record reaches the analyzer input."""
+        record = make_off_record()
+        path = tmp_path / "1_product.json"
+        path.write_text(json.dumps(record))
+
+        product_data = main.load_sample_product(str(path))
+
+        assert product_data["product"] == record["product"]
+        assert product_data["code"] == "0737628064502"
+        assert product_data["additives"] == ["E330"]
+
+    def test_array_with_leading_blank_lines(self, tmp_path):
+        """Test that a product array after blank lines is read item by item."""
+        records = [make_off_record(), {"product": {"product_name": "Oat milk"}}]
+        path = tmp_path / "1_products.json"
+        path.write_text("\n  \n" + json.dumps(records, indent=2))
+
+        products = list(main.iter_sample_products(str(path)))
+
+        assert [product["product"] for product in products] == [record["product"] for record in records]
+
+    def test_array_items_span_read_chunks(self, tmp_path, monkeypatch):
+        """Test that items split across chunk reads, even mid-character, decode intact."""
+        monkeypatch.setattr(main, "_READ_SIZE", 7)
+        records = [
+            {"product": {"product_name": "Crème brûlée", "nutriments": {"sugars_100g": 21.5}}},
+            {"product": {"product_name": "Müsli", "quantity": "500 g"}},
+            {"product": {"product_name": "Tofu"}, "code": 123456789}
+        ]
+        path = tmp_path / "1_products.json"
+        path.write_bytes(json.dumps(records, ensure_ascii=False).encode("utf-8"))
+
+        products = list(main.iter_sample_products(str(path)))
+
+        assert [product["product"] for product in products] == [record["product"] for record in records]
+        assert products[2]["code"] == 123456789
+
+    def test_large_item_is_not_redecoded_per_chunk(self, tmp_path, monkeypatch):
+        """Test that an item spanning many chunks is decoded a logarithmic number of times."""
+        monkeypatch.setattr(main, "_READ_SIZE", 16)
+        calls = []
+        decoder = main._JSON_DECODER
+        
+        class CountingDecoder:
+            def raw_decode(self, text, index):
+                calls.append(index)
+                return decoder.raw_decode(text, index)
+        
+        monkeypatch.setattr(main, "_JSON_DECODER", CountingDecoder())
+        record = {"product": {"ingredients_text": "x" * 64 * 1024}}
+        path = tmp_path / "1_products.json"
+        path.write_text(json.dumps([record]))
+        
+        assert [product["product"] for product in main.iter_sample_products(str(path))] == [record["product"]]
+        assert len(calls) < 20
+
+    def test_empty_and_malformed_arrays(self, tmp_path):
+        """Test empty files and arrays, and a missing separator between items."""
+        path = tmp_path / "1_products.json"
+        for text in ("", "\n\n"):
+            path.write_text(text)
+            with pytest.raises(json.JSONDecodeError):
+                list(main.iter_sample_products(str(path)))
+        
+        path.write_text("[ ]")
+        assert list(main.iter_sample_products(str(path))) == []
+
+        path.write_text('[{"product": {}} {"product": {}}]')
+        with pytest.raises(ValueError):
+            list(main.iter_sample_products(str(path)))
+
+
+class TestAdditiveClassification:
+    """Test suite for the additive classification shown in the results."""
+
+    def test_additive_on_both_lists(self):
+        """Test that an additive on both lists is harmful and counts as suspicious too."""
+        product_data = {"suspicious_additives": ["E102", "E211"], "harmful_additives": ["E211"]}
+        additives = ["E300", "E102", "E211"]
+        
+        classifications = main._classify_additives(additives, product_data)
+        
+        assert classifications == ["safe", "suspicious", "harmful"]
+        assert main._count_additives(additives, classifications, product_data) == (1, 2, 1)
+
+    def test_without_reference_lists(self):
+        """Test that every additive is safe when no reference lists are given."""
+        classifications = main._classify_additives(["E300", "E211"])
+        
+        assert classifications == ["safe", "safe"]
+        assert main._count_additives(["E300", "E211"], classifications) == (2, 0, 0)
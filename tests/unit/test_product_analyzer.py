@@ -1,7 +1,9 @@
 """Unit tests for the product analyzer."""
+import asyncio
 import json
 import pytest
-from unittest.mock import MagicMock, patch, Mock
+from types import MappingProxyType
+from unittest.mock import patch, Mock
 
 from wecare.services.ai_service.product_analyzer import ProductAnalyzer
 from wecare.services.ai_service.gpt_client import GPTClient
@@ -11,16 +13,35 @@ from wecare.core.models.schemas import (
 )
 
 
+class FakeGPTClient:
+    """Minimal stand-in for GPTClient that records its calls."""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def analyze_product(self, input_data):
+        self.calls.append(input_data)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+    async def aanalyze_product(self, input_data):
+        return self.analyze_product(input_data)
+
+    def analyze_products(self, inputs):
+        return [self.analyze_product(input_data) for input_data in inputs]
+
+    submit_batch = analyze_products
+
+
 class TestProductAnalyzer:
     """Test suite for the ProductAnalyzer."""
 
-    @pytest.fixture
-    def mock_gpt_client(self):
-        """Fixture providing a mock GPT client."""
-        mock_client = MagicMock(spec=GPTClient)
-        
-        # Set up a sample response
-        mock_response = AIServiceOutput(
+    @pytest.fixture(scope="class")
+    def gpt_response(self):
+        """Fixture providing the AI output returned by the fake GPT client."""
+        return AIServiceOutput(
             allergens_analysis=AllergenAnalysis(
                 detected_allergens=["Peanuts", "Soybeans"],
                 user_allergens_present=["Peanuts"]
@@ -44,14 +65,16 @@ class TestProductAnalyzer:
                 additives_score=70
             )
         )
-        
-        mock_client.analyze_product.return_value = mock_response
-        return mock_client
 
     @pytest.fixture
+    def mock_gpt_client(self, gpt_response):
+        """Fixture providing a fake GPT client."""
+        return FakeGPTClient(gpt_response)
+
+    @pytest.fixture(scope="class")
     def sample_product_data(self):
-        """Fixture providing sample product data."""
-        return {
+        """Fixture providing read-only sample product data."""
+        return MappingProxyType({
             "id": "0737628064502",
             "product": {
                 "_id": "0737628064502",
@@ -83,12 +106,14 @@ class TestProductAnalyzer:
             "safe_additives": ["E300", "E306", "E330"],
             "suspicious_additives": ["E102", "E104"],
             "harmful_additives": ["E211", "E250"]
-        }
+        })
 
     def test_initialization(self):
         """Test ProductAnalyzer initialization."""
         analyzer = ProductAnalyzer(api_key="test_key")
         assert isinstance(analyzer.gpt_client, GPTClient)
+        assert analyzer.cache_stats == {"hits": 0, "misses": 0, "size": 0}
+        assert ProductAnalyzer(api_key="test_key").gpt_client is analyzer.gpt_client
         
         # Test with custom parameters
         analyzer = ProductAnalyzer(
@@ -102,7 +127,7 @@ class TestProductAnalyzer:
     def test_analyze_product_with_ai_scoring(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
         """Test product analysis with AI scoring."""
         # Set up the mock GPT client
-        mock_gpt_client_class.return_value = mock_gpt_client
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
         
         # Create analyzer and analyze product
         analyzer = ProductAnalyzer(api_key="test_key")
@@ -114,8 +139,8 @@ class TestProductAnalyzer:
         )
         
         # Verify that GPT client was called with correct parameters
-        mock_gpt_client.analyze_product.assert_called_once()
-        call_args = mock_gpt_client.analyze_product.call_args[0][0]
+        assert len(mock_gpt_client.calls) == 1
+        call_args = mock_gpt_client.calls[0]
         assert call_args.product_info == sample_product_data
         assert call_args.user_allergens == ["Peanuts"]
         assert call_args.user_diets == ["Vegetarian", "Low-Sugar"]
@@ -135,11 +160,70 @@ class TestProductAnalyzer:
         assert result.product.score.total == 75
         assert result.product.score.category == "Good"
 
+    @patch("wecare.services.ai_service.product_analyzer.GPTClient")
+    def test_aanalyze_product_concurrently(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
+        """Test that async analyses can run concurrently and match the sync result."""
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
+        analyzer = ProductAnalyzer(api_key="test_key")
+        diets = ["Vegetarian", "Low-Sugar"]
+
+        async def analyze_both():
+            return await asyncio.gather(
+                analyzer.aanalyze_product(sample_product_data, ["Peanuts"], diets),
+                analyzer.aanalyze_product(sample_product_data, ["Milk"], diets)
+            )
+
+        peanuts, milk = asyncio.run(analyze_both())
+
+        assert [call.user_allergens for call in mock_gpt_client.calls] == [["Peanuts"], ["Milk"]]
+        expected = analyzer.analyze_product(sample_product_data, ["Peanuts"], diets)
+        assert peanuts.product == expected.product
+        assert peanuts.allergens_analysis == expected.allergens_analysis
+        assert peanuts.product.score.total == 75
+        assert milk.allergens_analysis.user_allergens_present == ["Peanuts"]
+
+        # The same analyses through the bounded fan-out, in request order
+        results = asyncio.run(analyzer.aanalyze_products([
+            {"product_info": sample_product_data, "user_allergens": allergens, "user_diets": diets}
+            for allergens in (["Peanuts"], ["Milk"])
+        ], max_concurrency=1))
+
+        assert [result.product for result in results] == [peanuts.product, milk.product]
+        assert [call.user_allergens for call in mock_gpt_client.calls[-2:]] == [["Peanuts"], ["Milk"]]
+
+    @pytest.mark.parametrize("batch_mode", [False, True])
+    @patch("wecare.services.ai_service.product_analyzer.GPTClient")
+    def test_analyze_products(self, mock_gpt_client_class, sample_product_data, gpt_response, batch_mode):
+        """Test that several products are analyzed with one GPT client call."""
+        fake_client = FakeGPTClient(gpt_response)
+        mock_gpt_client_class.get_shared.return_value = fake_client
+        analyzer = ProductAnalyzer(api_key="test_key", batch_mode=batch_mode)
+        with_score = {**sample_product_data, "score": {"total": 90}}
+
+        results = analyzer.analyze_products([
+            {"product_info": sample_product_data, "user_allergens": ["Peanuts"], "user_diets": ["Vegetarian"]},
+            # Nothing to ask GPT for
+            {"product_info": with_score, "user_allergens": [], "user_diets": []}
+        ])
+
+        assert len(fake_client.calls) == 1
+        assert results[0].product.score.total == 75
+        assert results[0].allergens_analysis.user_allergens_present == ["Peanuts"]
+        assert results[1].product.score.total == 90
+        assert results[1].diet_compatibility == []
+
+        # A failed GPT request falls back for every product that needed it
+        fake_client.response = Exception("API Error")
+        results = analyzer.analyze_products([
+            {"product_info": with_score, "user_allergens": ["Peanuts"], "user_diets": ["Vegetarian"]}
+        ])
+        assert "Unable to determine" in results[0].diet_compatibility[0].reason
+
     @patch("wecare.services.ai_service.product_analyzer.GPTClient")
     def test_analyze_product_with_local_scoring(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
         """Test product analysis with local scoring engine."""
         # Set up the mock GPT client
-        mock_gpt_client_class.return_value = mock_gpt_client
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
         
         # Create analyzer and analyze product with local scoring
         analyzer = ProductAnalyzer(api_key="test_key")
@@ -163,15 +247,15 @@ class TestProductAnalyzer:
             )
             
             # Verify that GPT client was called with correct parameters
-            mock_gpt_client.analyze_product.assert_called_once()
-            call_args = mock_gpt_client.analyze_product.call_args[0][0]
+            assert len(mock_gpt_client.calls) == 1
+            call_args = mock_gpt_client.calls[0]
             assert call_args.product_info == sample_product_data
             assert call_args.user_allergens == ["Peanuts"]
             assert call_args.user_diets == ["Vegetarian", "Low-Sugar"]
             assert call_args.calculate_score is False
             
             # Verify that scoring engine was called
-            mock_scoring_engine.calculate_score.assert_called_once_with(sample_product_data)
+            mock_scoring_engine.calculate_score.assert_called_once_with(sample_product_data, None)
             
             # Verify the result structure
             assert isinstance(result, ProductAnalysis)
@@ -183,9 +267,10 @@ class TestProductAnalyzer:
     def test_analyze_product_with_external_score(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
         """Test product analysis with external score."""
         # Set up the mock GPT client
-        mock_gpt_client_class.return_value = mock_gpt_client
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
         
-        # Add a score to the product data
+        # Add a score to a copy of the product data
+        sample_product_data = dict(sample_product_data)
         sample_product_data["score"] = {
             "total": 90,
             "category": "Excellent",
@@ -203,8 +288,8 @@ class TestProductAnalyzer:
         )
         
         # Verify that GPT client was called with correct parameters
-        mock_gpt_client.analyze_product.assert_called_once()
-        call_args = mock_gpt_client.analyze_product.call_args[0][0]
+        assert len(mock_gpt_client.calls) == 1
+        call_args = mock_gpt_client.calls[0]
         assert call_args.calculate_score is False  # Should not request score calculation
         
         # Verify the result structure and external score usage
@@ -212,14 +297,67 @@ class TestProductAnalyzer:
         assert result.product.score is not None
         assert result.product.score.total == 90
         assert result.product.score.category == "Excellent"
+        
+        # Products with the same external score share one Score instance
+        repeat = analyzer.analyze_product(sample_product_data, ["Peanuts"], [])
+        assert repeat.product.score is result.product.score
+
+    @patch("wecare.services.ai_service.product_analyzer.GPTClient")
+    def test_analyze_product_external_score_without_preferences(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
+        """Test that GPT is skipped when it has nothing to analyze."""
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
+        
+        sample_product_data = dict(sample_product_data)
+        sample_product_data["score"] = {
+            "total": 90,
+            "category": "Excellent",
+            "nutrition_score": 95,
+            "additives_score": 85
+        }
+        
+        analyzer = ProductAnalyzer(api_key="test_key")
+        result = analyzer.analyze_product(
+            product_info=sample_product_data,
+            user_allergens=[],
+            user_diets=[],
+            use_ai_scoring=True
+        )
+        
+        # No GPT call is needed
+        assert mock_gpt_client.calls == []
+        assert result.allergens_analysis.detected_allergens == []
+        assert result.diet_compatibility == []
+        assert result.product.score.total == 90
+
+    @patch("wecare.services.ai_service.product_analyzer.GPTClient")
+    def test_analyze_product_local_scoring_without_preferences(self, mock_gpt_client_class, sample_product_data, mock_gpt_client):
+        """Test that GPT still detects allergens when the score is calculated locally."""
+        mock_gpt_client_class.get_shared.return_value = mock_gpt_client
+        
+        analyzer = ProductAnalyzer(api_key="test_key")
+        with patch("wecare.services.ai_service.product_analyzer.ScoringEngine") as mock_scoring_engine:
+            mock_scoring_engine.calculate_score.return_value = Score(
+                total=65,
+                category="Good",
+                nutrition_score=70,
+                additives_score=60
+            )
+            result = analyzer.analyze_product(
+                product_info=sample_product_data,
+                user_allergens=[],
+                user_diets=[],
+                use_ai_scoring=False
+            )
+        
+        assert len(mock_gpt_client.calls) == 1
+        assert mock_gpt_client.calls[0].calculate_score is False
+        assert result.allergens_analysis.detected_allergens != []
 
     @patch("wecare.services.ai_service.product_analyzer.GPTClient")
     def test_analyze_product_with_gpt_error(self, mock_gpt_client_class, sample_product_data):
         """Test product analysis with GPT error."""
         # Set up the mock GPT client to raise an exception
-        mock_client = MagicMock(spec=GPTClient)
-        mock_client.analyze_product.side_effect = Exception("API Error")
-        mock_gpt_client_class.return_value = mock_client
+        mock_gpt_client_class.get_shared.return_value = FakeGPTClient(Exception("API Error"))
         
         # Create analyzer and analyze product
         analyzer = ProductAnalyzer(api_key="test_key")
@@ -326,4 +464,12 @@ class TestProductAnalyzer:
         assert "Unable to determine" in result.diet_compatibility[0].reason
         assert result.diet_compatibility[1].diet == "Gluten-Free"
         assert result.diet_compatibility[1].compatible is False
-        assert result.score is None 
\ No newline at end of file
+        assert result.score is None
+        
+        # Verdicts for the same diets are reused, the list itself is not
+        repeated = analyzer._create_fallback_analysis(
+            user_allergens=[],
+            user_diets=["Vegetarian", "Gluten-Free"]
+        )
+        assert repeated.diet_compatibility[0] is result.diet_compatibility[0]
+        assert repeated.diet_compatibility is not result.diet_compatibility 
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Unit tests for the AI response cache."""
+import pytest
+from unittest.mock import patch
+
+from wecare.services.ai_service.response_cache import ResponseCache
+from wecare.core.models.schemas import AIServiceInput, AIServiceOutput
+
+
+@pytest.fixture
+def sample_output(sample_allergen_analysis, sample_diet_compatibility, sample_score):
+    """Create an AI service output for caching."""
+    return AIServiceOutput(
+        allergens_analysis=sample_allergen_analysis,
+        diet_compatibility=sample_diet_compatibility,
+        score=sample_score
+    )
+
+
+def make_input(name, calculate_score=True):
+    """Create an AI service input for the given product name."""
+    return AIServiceInput(
+        product_info={"name": name},
+        user_allergens=["Peanuts"],
+        user_diets=["Vegan"],
+        calculate_score=calculate_score
+    )
+
+
+class TestResponseCache:
+    """Test suite for the response cache."""
+
+    def test_make_key(self):
+        """Test that keys depend on every part of the request."""
+        key = ResponseCache.make_key(make_input("A"))
+        assert key == ResponseCache.make_key(make_input("A"))
+        assert key != ResponseCache.make_key(make_input("B"))
+        assert key != ResponseCache.make_key(make_input("A", calculate_score=False))
+        assert key != ResponseCache.make_key(make_input("A"), model="other-model")
+
+    def test_get_and_put(self, sample_output):
+        """Test cache hits, misses and copies of stored entries."""
+        cache = ResponseCache()
+        key = cache.make_key(make_input("A"))
+
+        assert cache.get(key) is None
+        cache.put(key, sample_output)
+        cached = cache.get(key)
+
+        assert cached == sample_output
+        assert cached is not sample_output
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_eviction(self, sample_output):
+        """Test that the least recently used entry is evicted when full."""
+        cache = ResponseCache(maxsize=2)
+        keys = [cache.make_key(make_input(name)) for name in ("A", "B", "C")]
+
+        cache.put(keys[0], sample_output)
+        cache.put(keys[1], sample_output)
+        cache.get(keys[0])
+        cache.put(keys[2], sample_output)
+
+        assert len(cache) == 2
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+
+    def test_disabled_and_clear(self, sample_output):
+        """Test a zero-size cache and clearing a populated one."""
+        disabled = ResponseCache(maxsize=0)
+        key = disabled.make_key(make_input("A"))
+        disabled.put(key, sample_output)
+        assert len(disabled) == 0
+
+        cache = ResponseCache()
+        cache.put(key, sample_output)
+        cache.get(key)
+        cache.clear()
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_ttl_expiry(self, sample_output):
+        """Test that entries expire after the TTL and are then dropped."""
+        cache = ResponseCache(ttl=60)
+        key = cache.make_key(make_input("A"))
+
+        with patch("wecare.services.ai_service.response_cache.time.monotonic", return_value=1000.0):
+            cache.put(key, sample_output)
+        with patch("wecare.services.ai_service.response_cache.time.monotonic", return_value=1059.0):
+            assert cache.get(key) == sample_output
+        with patch("wecare.services.ai_service.response_cache.time.monotonic", return_value=1060.0):
+            assert cache.get(key) is None
+
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_sqlite_backing(self, sample_output, tmp_path):
+        """Test that responses persist in the SQLite file across cache instances."""
+        path = str(tmp_path / "responses.db")
+        key = ResponseCache.make_key(make_input("A"))
+
+        ResponseCache(path=path).put(key, sample_output)
+
+        cache = ResponseCache(maxsize=1, path=path)
+        assert cache.get(key) == sample_output
+        assert len(cache) == 1
+
+        # Evicted from memory, then promoted back from the file
+        cache.put(ResponseCache.make_key(make_input("B")), sample_output)
+        assert cache.get(key) == sample_output
+        assert cache.stats() == {"hits": 2, "misses": 0, "size": 1}
+
+        cache.clear()
+        assert ResponseCache(path=path).get(key) is None
+
+    def test_sqlite_ttl_expiry(self, sample_output, tmp_path):
+        """Test that expired responses in the SQLite file are not returned."""
+        path = str(tmp_path / "responses.db")
+        key = ResponseCache.make_key(make_input("A"))
+
+        with patch("wecare.services.ai_service.response_cache.time.time", return_value=1000.0):
+            ResponseCache(ttl=60, path=path).put(key, sample_output)
+        with patch("wecare.services.ai_service.response_cache.time.time", return_value=1059.0):
+            assert ResponseCache(ttl=60, path=path).get(key) == sample_output
+        with patch("wecare.services.ai_service.response_cache.time.time", return_value=1060.0):
+            assert ResponseCache(ttl=60, path=path).get(key) is None
+
+    def test_sqlite_round_trip_without_score(self, sample_allergen_analysis, sample_diet_compatibility, tmp_path):
+        """Test that an output without a score is read back from the SQLite file."""
+        path = str(tmp_path / "responses.db")
+        key = ResponseCache.make_key(make_input("A", calculate_score=False))
+        output = AIServiceOutput(
+            allergens_analysis=sample_allergen_analysis,
+            diet_compatibility=sample_diet_compatibility,
+            score=None
+        )
+
+        ResponseCache(path=path).put(key, output)
+        assert ResponseCache(path=path).get(key) == output
+
+    def test_sqlite_undecodable_row_is_miss(self, sample_output, tmp_path):
+        """Test that a row that cannot be decoded is treated as a miss and replaced."""
+        path = str(tmp_path / "responses.db")
+        key = ResponseCache.make_key(make_input("A"))
+        cache = ResponseCache(path=path)
+        cache._db.execute("INSERT INTO responses VALUES (?, NULL, ?)", (key, '{"score": null}'))
+
+        assert cache.get(key) is None
+        cache.put(key, sample_output)
+        assert ResponseCache(path=path).get(key) == sample_output
@@ -1,6 +1,6 @@
 """Unit tests for the core data models."""
+import json
 import pytest
-from dataclasses import asdict
 
 from wecare.core.models.schemas import (
     Weight, Ingredient, FatInfo, CarbInfo, NutritionInfo,
@@ -19,8 +19,7 @@ class TestDataModels:
         assert weight.unit == "g"
         
         # Test dictionary conversion
-        weight_dict = asdict(weight)
-        assert weight_dict == {"value": 100.0, "unit": "g"}
+        assert weight.to_dict() == {"value": 100.0, "unit": "g"}
 
     def test_ingredient_initialization(self):
         """Test Ingredient dataclass initialization."""
@@ -70,6 +69,33 @@ class TestDataModels:
         assert score.nutrition_score == 90
         assert score.additives_score == 80
 
+    def test_value_objects_are_immutable(self):
+        """Test that the nutrition and score value objects are frozen."""
+        from dataclasses import FrozenInstanceError
+
+        score = Score(total=85, category="Excellent", nutrition_score=90, additives_score=80)
+        with pytest.raises(FrozenInstanceError):
+            score.total = 10
+
+        weight = Weight(value=100.0, unit="g")
+        assert not hasattr(weight, "__dict__")
+
+        ingredient = Ingredient(name="Sugar", safety="suspicious")
+        with pytest.raises(FrozenInstanceError):
+            ingredient.safety = "safe"
+        assert {ingredient: 1}[Ingredient(name="Sugar", safety="suspicious")] == 1
+
+    def test_models_are_slotted(self, sample_product_analysis):
+        """Test that no model instance carries a per-instance __dict__."""
+        for model in (
+            sample_product_analysis,
+            sample_product_analysis.product,
+            sample_product_analysis.allergens_analysis,
+            Ingredient(name="Sugar", safety="safe"),
+            AIServiceInput(product_info={}, user_allergens=[], user_diets=[])
+        ):
+            assert not hasattr(model, "__dict__")
+
     def test_product_info_initialization(self, sample_score):
         """Test ProductInfo dataclass initialization."""
         weight = Weight(value=200.0, unit="g")
@@ -152,6 +178,25 @@ class TestDataModels:
         assert analysis.allergens_analysis is sample_allergen_analysis
         assert analysis.diet_compatibility == diet_compatibility
 
+    def test_product_analysis_to_dict(self, sample_product_analysis):
+        """Test nested dictionary conversion of a product analysis."""
+        analysis_dict = sample_product_analysis.to_dict()
+        
+        assert set(analysis_dict) == {"product", "allergens_analysis", "diet_compatibility", "scan_timestamp"}
+        assert analysis_dict["product"]["weight"] == {"value": 155.0, "unit": "g"}
+        assert analysis_dict["product"]["score"] == {
+            "total": 75, "category": "Good", "nutrition_score": 80, "additives_score": 70
+        }
+        assert analysis_dict["allergens_analysis"] == {
+            "detected_allergens": ["Peanuts", "Soybeans"],
+            "user_allergens_present": ["Peanuts"]
+        }
+        assert analysis_dict["diet_compatibility"][0] == {
+            "diet": "Vegetarian", "compatible": True, "reason": "Contains no meat products"
+        }
+        assert analysis_dict["product"]["nutrition"]["fat"] == {"total": 7.69, "saturated": 1.92}
+        assert analysis_dict["product"]["additives"] is not sample_product_analysis.product.additives
+
     def test_ai_service_input_initialization(self):
         """Test AIServiceInput dataclass initialization."""
         product_info = {"name": "Test Product", "ingredients": ["Sugar", "Water"]}
@@ -192,4 +237,44 @@ class TestDataModels:
             score=None
         )
         
-        assert service_output_no_score.score is None 
\ No newline at end of file
+        assert service_output_no_score.score is None 
+
+    def test_ai_service_output_from_json(self, sample_allergen_analysis, sample_score):
+        """Test AIServiceOutput construction from a JSON document."""
+        document = {
+            "allergens_analysis": sample_allergen_analysis.to_dict(),
+            "diet_compatibility": [{"diet": "Vegan", "compatible": True, "reason": "All plant-based"}],
+            "score": sample_score.to_dict()
+        }
+        
+        service_output = AIServiceOutput.from_json(json.dumps(document).encode("utf-8"))
+        
+        assert service_output.allergens_analysis == sample_allergen_analysis
+        assert service_output.diet_compatibility == [
+            DietCompatibility(diet="Vegan", compatible=True, reason="All plant-based")
+        ]
+        assert service_output.score == sample_score
+        
+        # Test with optional score omitted
+        del document["score"]
+        assert AIServiceOutput.from_json(json.dumps(document)).score is None
+        
+        # Test with a null score, as written by to_dict
+        document["score"] = None
+        assert AIServiceOutput.from_json(json.dumps(document)).score is None
+
+    def test_ai_service_output_copy(self, sample_allergen_analysis, sample_diet_compatibility, sample_score):
+        """Test that copies share only immutable members."""
+        service_output = AIServiceOutput(
+            allergens_analysis=sample_allergen_analysis,
+            diet_compatibility=sample_diet_compatibility,
+            score=sample_score
+        )
+        
+        copied = service_output.copy()
+        
+        assert copied == service_output
+        assert copied.allergens_analysis.detected_allergens is not sample_allergen_analysis.detected_allergens
+        assert copied.diet_compatibility is not sample_diet_compatibility
+        assert copied.diet_compatibility[0] is sample_diet_compatibility[0]
+        assert copied.score is sample_score
@@ -2,33 +2,49 @@
 import pytest
 from unittest.mock import patch
 
-from wecare.core.scoring.scoring_engine import ScoringEngine, ScoringError
+from wecare.core.scoring.scoring_engine import ScoringEngine, ScoringError, ScoringInput
 
 
 class TestScoringEngine:
     """Test suite for the ScoringEngine."""
 
-    def test_get_score_category(self):
+    @pytest.mark.parametrize("score,expected", [
+        # Each category boundary
+        (100, "Excellent"),
+        (81, "Excellent"),
+        (80, "Good"),
+        (61, "Good"),
+        (60, "Average"),
+        (41, "Average"),
+        (40, "Low Quality"),
+        (21, "Low Quality"),
+        (20, "Very Low Quality"),
+        (0, "Very Low Quality")
+    ])
+    def test_get_score_category(self, score, expected):
         """Test the score category determination."""
-        # Test each category boundary
-        assert ScoringEngine.get_score_category(100) == "Excellent"
-        assert ScoringEngine.get_score_category(81) == "Excellent"
-        assert ScoringEngine.get_score_category(80) == "Good"
-        assert ScoringEngine.get_score_category(61) == "Good"
-        assert ScoringEngine.get_score_category(60) == "Average"
-        assert ScoringEngine.get_score_category(41) == "Average"
-        assert ScoringEngine.get_score_category(40) == "Low Quality"
-        assert ScoringEngine.get_score_category(21) == "Low Quality"
-        assert ScoringEngine.get_score_category(20) == "Very Low Quality"
-        assert ScoringEngine.get_score_category(0) == "Very Low Quality"
+        assert ScoringEngine.get_score_category(score) == expected
 
-    def test_get_score_category_invalid_value(self):
+    def test_get_score_category_float(self):
+        """Test that whole-number float scores are categorized like ints."""
+        assert ScoringEngine.get_score_category(50.0) == "Average"
+        assert ScoringEngine.get_score_category(100.0) == "Excellent"
+
+    @pytest.mark.parametrize("bad", [101, -1, 1000, -1000, 80.5, 0.1])
+    def test_get_score_category_invalid_value(self, bad):
         """Test error handling for invalid score values."""
         with pytest.raises(ScoringError):
-            ScoringEngine.get_score_category(101)
-        
-        with pytest.raises(ScoringError):
-            ScoringEngine.get_score_category(-1)
+            ScoringEngine.get_score_category(bad)
+
+    def test_scoring_tables_are_read_only(self):
+        """Test that the weight and threshold tables cannot be changed at runtime."""
+        with pytest.raises(TypeError):
+            ScoringEngine.NUTRITION_WEIGHTS["proteins"] = 1.0  # type: ignore
+
+        with pytest.raises(TypeError):
+            ScoringEngine.SUGAR_THRESHOLDS["high"] = 50.0  # type: ignore
+
+        assert ScoringEngine.PROTEIN_THRESHOLDS["high"] == 5.0
 
     def test_calculate_score_missing_data(self):
         """Test error handling for missing product data."""
@@ -76,157 +92,108 @@ class TestScoringEngine:
         
         assert "Both additives and ingredients information is missing" in str(excinfo.value)
 
-    def test_calculate_nutrition_score(self):
+    def test_calculate_nutrition_score(self, base_nutrition):
         """Test nutrition score calculation."""
-        product_data = {
-            "nutrition": {
-                "calories": 350,
-                "protein": 8.5,  # High: 10 points
-                "fat": {"total": 10.5, "saturated": 1.2},  # Low sat. fat: 10 points
-                "carbohydrates": {"total": 45.0, "sugar": 4.5},  # Low sugar: 10 points
-                "fiber": 6.5,  # High fiber: 10 points
-                "salt": 0.2,  # Low salt: 10 points
-                "sodium": 0.1
-            }
-        }
-        
         # Expected weighted calculation:
-        # (10 * 0.2) + (10 * 0.2) + (10 * 0.2) + (10 * 0.1) + (10 * 0.1) + (10 * 0.2) = 10
-        # 10 * 10 = 100
-        nutrition_score = ScoringEngine._calculate_nutrition_score(product_data)
+        # (10 * 0.2) + (10 * 0.2) + (10 * 0.2) + (10 * 0.1) + (10 * 0.1) + (5 * 0.2) = 9
+        # 9 * 10 = 90
+        nutrition_score = ScoringEngine._calculate_nutrition_score({"nutrition": base_nutrition})
         assert nutrition_score == 90
+        assert isinstance(nutrition_score, int)
 
-    def test_calculate_nutrition_score_medium_values(self):
-        """Test nutrition score calculation with medium values."""
-        product_data = {
-            "nutrition": {
-                "calories": 350,  # Medium: 5 points
-                "protein": 3.0,  # Medium: 5 points
-                "fat": {"total": 10.5, "saturated": 3.0},  # Medium sat. fat: 5 points
-                "carbohydrates": {"total": 45.0, "sugar": 10.0},  # Medium sugar: 5 points
-                "fiber": 3.5,  # Medium fiber: 5 points
-                "salt": 1.0,  # Medium salt: 5 points
+    @pytest.mark.parametrize("nutrition,expected", [
+        (
+            # Every value in the medium band: 5 points each
+            {
+                "calories": 350,
+                "protein": 3.0,
+                "fat": {"total": 10.5, "saturated": 3.0},
+                "carbohydrates": {"total": 45.0, "sugar": 10.0},
+                "fiber": 3.5,
+                "salt": 1.0,
                 "sodium": 0.4
-            }
-        }
-        
-        # Expected weighted calculation:
-        # (5 * 0.2) + (5 * 0.2) + (5 * 0.2) + (5 * 0.1) + (5 * 0.1) + (5 * 0.2) = 5
-        # 5 * 10 = 50
-        nutrition_score = ScoringEngine._calculate_nutrition_score(product_data)
-        assert nutrition_score == 50
-
-    def test_calculate_nutrition_score_low_values(self):
-        """Test nutrition score calculation with low values."""
-        product_data = {
-            "nutrition": {
-                "calories": 450,  # High: 0 points
-                "protein": 1.0,  # Low: 0 points
-                "fat": {"total": 10.5, "saturated": 6.0},  # High sat. fat: 0 points
-                "carbohydrates": {"total": 45.0, "sugar": 25.0},  # High sugar: 0 points
-                "fiber": 1.5,  # Low fiber: 0 points
-                "salt": 2.0,  # High salt: 0 points
+            },
+            50
+        ),
+        (
+            # Every value in the poor band: 0 points each
+            {
+                "calories": 450,
+                "protein": 1.0,
+                "fat": {"total": 10.5, "saturated": 6.0},
+                "carbohydrates": {"total": 45.0, "sugar": 25.0},
+                "fiber": 1.5,
+                "salt": 2.0,
                 "sodium": 0.8
-            }
-        }
-        
-        # Expected weighted calculation:
-        # (0 * 0.2) + (0 * 0.2) + (0 * 0.2) + (0 * 0.1) + (0 * 0.1) + (0 * 0.2) = 0
-        # 0 * 10 = 0
-        nutrition_score = ScoringEngine._calculate_nutrition_score(product_data)
-        assert nutrition_score == 0
+            },
+            0
+        )
+    ], ids=["medium_values", "low_values"])
+    def test_calculate_nutrition_score_bands(self, nutrition, expected):
+        """Test nutrition score calculation with medium and low values."""
+        nutrition_score = ScoringEngine._calculate_nutrition_score({"nutrition": nutrition})
+        assert nutrition_score == expected
 
-    def test_calculate_additives_score_all_safe(self):
-        """Test additives score calculation with all safe additives."""
-        product_data = {
-            "additives": ["E300", "E306"],
-            "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
-        }
-        
-        # All additives are safe: 10 points
-        # No suspicious additives: 10 points
-        # No harmful additives: 10 points
-        # (10 * 0.4) + (10 * 0.3) + (10 * 0.3) = 10
-        # 10 * 10 = 100
-        additives_score = ScoringEngine._calculate_additives_score(product_data)
-        assert additives_score == 100
+    @pytest.mark.parametrize("additives,expected", [
+        # All safe: (10 * 0.4) + (10 * 0.3) + (10 * 0.3) = 10 -> 100
+        (["E300", "E306"], 100),
+        # Some safe, one suspicious: (5 * 0.4) + (0 * 0.3) + (10 * 0.3) = 5 -> 50
+        (["E300", "E102"], 50),
+        # Some safe, one harmful: (5 * 0.4) + (10 * 0.3) + (0 * 0.3) = 5 -> 50
+        (["E300", "E211"], 50),
+        # No additives is neutral: (5 * 0.4) + (5 * 0.3) + (5 * 0.3) = 5 -> 50
+        ([], 50),
+        # Unclassified only: (0 * 0.4) + (10 * 0.3) + (10 * 0.3) = 6 -> 60
+        (["E999"], 60)
+    ], ids=["all_safe", "mixed", "harmful", "no_additives", "unclassified"])
+    def test_calculate_additives_score(self, additive_refs, additives, expected):
+        """Test additives score calculation for each additive mix."""
+        product_data = {"additives": additives, "ingredients": [], **additive_refs}
 
-    def test_calculate_additives_score_mixed(self):
-        """Test additives score calculation with mixed additives."""
-        product_data = {
-            "additives": ["E300", "E102"],  # One safe, one suspicious
-            "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
-        }
-        
-        # Some additives are safe: 5 points
-        # Contains suspicious additives: 0 points
-        # No harmful additives: 10 points
-        # (5 * 0.4) + (0 * 0.3) + (10 * 0.3) = 5
-        # 5 * 10 = 50
         additives_score = ScoringEngine._calculate_additives_score(product_data)
-        assert additives_score == 50
+        assert additives_score == expected
+
+    def test_calculate_additives_score_settings_reference_sets(self):
+        """Test additives score calculation against the frozensets from settings."""
+        from wecare.config import settings
 
-    def test_calculate_additives_score_harmful(self):
-        """Test additives score calculation with harmful additives."""
+        assert settings.SUSPICIOUS_ADDITIVES.isdisjoint(settings.HARMFUL_ADDITIVES)
         product_data = {
             "additives": ["E300", "E211"],  # One safe, one harmful
             "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
+            "safe_additives": settings.SAFE_ADDITIVES,
+            "suspicious_additives": settings.SUSPICIOUS_ADDITIVES,
+            "harmful_additives": settings.HARMFUL_ADDITIVES
         }
-        
-        # Some additives are safe: 5 points
-        # No suspicious additives: 10 points
-        # Contains harmful additives: 0 points
-        # (5 * 0.4) + (10 * 0.3) + (0 * 0.3) = 5
-        # 5 * 10 = 50
+
         additives_score = ScoringEngine._calculate_additives_score(product_data)
         assert additives_score == 50
 
-    def test_calculate_additives_score_no_additives(self):
-        """Test additives score calculation with no additives."""
-        product_data = {
-            "additives": [],
-            "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
-        }
+    def test_passed_reference_lists(self, additive_refs):
+        """Test that passed reference lists are used when product data omits them."""
+        product_data = {"additives": ["E300", "E211"], "ingredients": []}
+        references = ScoringEngine.reference_lists(**additive_refs)
         
-        # No additives: 5 points (neutral)
-        # No additives: 5 points (neutral)
-        # No additives: 5 points (neutral)
-        # (5 * 0.4) + (5 * 0.3) + (5 * 0.3) = 5
-        # 5 * 10 = 50
-        additives_score = ScoringEngine._calculate_additives_score(product_data)
-        assert additives_score == 50
+        assert ScoringEngine._calculate_additives_score(product_data, references) == 50
+        # Lists given with the product still take precedence
+        assert ScoringEngine._calculate_additives_score(
+            {**product_data, "harmful_additives": []}, references
+        ) == 80
+        
+        # Passing references leaves no state behind for later callers
+        with pytest.raises(ScoringError) as excinfo:
+            ScoringEngine._calculate_additives_score(product_data)
+        assert "Safe additives reference list is missing" in str(excinfo.value)
 
-    def test_calculate_score_complete(self):
+    def test_calculate_score_complete(self, base_nutrition, additive_refs):
         """Test complete score calculation with all components."""
         product_data = {
             "id": "123",
             "name": "Test Product",
-            "nutrition": {
-                "calories": 350,  # Medium: 5 points
-                "protein": 8.5,  # High: 10 points
-                "fat": {"total": 10.5, "saturated": 1.2},  # Low sat. fat: 10 points
-                "carbohydrates": {"total": 45.0, "sugar": 4.5},  # Low sugar: 10 points
-                "fiber": 6.5,  # High fiber: 10 points
-                "salt": 0.2,  # Low salt: 10 points
-                "sodium": 0.1
-            },
+            "nutrition": base_nutrition,
             "additives": ["E300", "E306"],  # All safe
             "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
+            **additive_refs
         }
         
         # Nutrition score: (10 * 0.2) + (10 * 0.2) + (10 * 0.2) + (10 * 0.1) + (10 * 0.1) + (5 * 0.2) = 9 * 10 = 90
@@ -240,7 +207,78 @@ class TestScoringEngine:
         assert score.nutrition_score == 90
         assert score.additives_score == 100
 
-    def test_calculate_score_poor_quality(self):
+    def test_calculate_score_from_scoring_input(self, base_nutrition, additive_refs):
+        """Test that a ScoringInput scores the same as the equivalent dict."""
+        product_data = {
+            "nutrition": base_nutrition,
+            "additives": ["E300"],
+            "ingredients": [{"name": "E306", "id": "en:e306"}],
+            **additive_refs
+        }
+        
+        scoring_input = ScoringInput.from_dict(product_data)
+        
+        assert scoring_input.saturated_fat == 1.2
+        assert scoring_input.additives == frozenset({"E300", "E306"})
+        assert ScoringEngine.calculate_score(scoring_input) is ScoringEngine.calculate_score(product_data)
+
+    def test_calculate_score_is_memoized(self, base_nutrition, additive_refs):
+        """Test that repeated products are scored from the cache until it is cleared."""
+        from wecare.core.scoring.scoring_engine import _cached_score
+        
+        product_data = {"nutrition": base_nutrition, "additives": ["E300"], **additive_refs}
+        ScoringEngine.clear_score_cache()
+        
+        first = ScoringEngine.calculate_score(product_data)
+        assert ScoringEngine.calculate_score(dict(product_data)) is first
+        assert _cached_score.cache_info().hits == 1
+        
+        ScoringEngine.clear_score_cache()
+        assert ScoringEngine.calculate_score(product_data) is not first
+
+    def test_calculate_scores_batch(self, base_nutrition, additive_refs):
+        """Test that batch scoring matches scoring products one by one."""
+        products = [
+            {"nutrition": base_nutrition, "additives": ["E300"], **additive_refs},
+            {"nutrition": base_nutrition, "additives": ["E211"], **additive_refs}
+        ]
+        
+        scores = ScoringEngine.calculate_scores(products)
+        
+        assert scores == [ScoringEngine.calculate_score(product) for product in products]
+        assert [score.additives_score for score in scores] == [100, 30]
+        
+        with pytest.raises(ScoringError):
+            ScoringEngine.calculate_scores([products[0], {}])
+
+    def test_calculate_score_non_numeric_value(self, base_nutrition, additive_refs):
+        """Test that non-numeric values are rejected before scoring."""
+        product_data = {
+            "nutrition": {**base_nutrition, "protein": [8.5]},
+            "additives": [],
+            **additive_refs
+        }
+        
+        with pytest.raises(ScoringError) as excinfo:
+            ScoringEngine.calculate_score(product_data)
+        
+        assert "Failed to calculate nutrition score" in str(excinfo.value)
+        assert "Protein value is not a number" in str(excinfo.value)
+
+    def test_scoring_input_from_dict_errors(self, base_nutrition):
+        """Test that ScoringInput.from_dict reports which component failed."""
+        with pytest.raises(ScoringError) as excinfo:
+            ScoringInput.from_dict({"nutrition": {"protein": 1.0}, "additives": []})
+        
+        assert "Failed to calculate nutrition score" in str(excinfo.value)
+        assert "Fat information is missing" in str(excinfo.value)
+        
+        with pytest.raises(ScoringError) as excinfo:
+            ScoringInput.from_dict({"nutrition": base_nutrition, "additives": []})
+        
+        assert "Failed to calculate additives score" in str(excinfo.value)
+
+    def test_calculate_score_poor_quality(self, additive_refs):
         """Test complete score calculation with poor quality product."""
         product_data = {
             "id": "123",
@@ -256,9 +294,7 @@ class TestScoringEngine:
             },
             "additives": ["E102", "E211"],  # One suspicious, one harmful
             "ingredients": [],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
+            **additive_refs
         }
         
         # Nutrition score: (0 * 0.2) + (0 * 0.2) + (0 * 0.2) + (0 * 0.1) + (0 * 0.1) + (0 * 0.2) = 0 * 10 = 0
@@ -272,7 +308,7 @@ class TestScoringEngine:
         assert score.nutrition_score == 0
         assert score.additives_score == 0
 
-    def test_ingredient_additives_extraction(self):
+    def test_ingredient_additives_extraction(self, additive_refs):
         """Test extraction of additives from ingredients list."""
         product_data = {
             "additives": [],
@@ -281,9 +317,7 @@ class TestScoringEngine:
                 {"name": "Sugar", "id": "en:sugar"},
                 {"name": "E211", "id": "en:e211"}
             ],
-            "safe_additives": ["E300", "E306", "E330"],
-            "suspicious_additives": ["E102", "E104"],
-            "harmful_additives": ["E211", "E250"]
+            **additive_refs
         }
         
         # One safe, one harmful
@@ -295,6 +329,23 @@ class TestScoringEngine:
         additives_score = ScoringEngine._calculate_additives_score(product_data)
         assert additives_score == 50
 
+    @pytest.mark.parametrize("ingredient,message", [
+        ("E300", "Ingredient data is not in the expected format"),
+        ({"id": "en:e300"}, "Ingredient name is missing")
+    ], ids=["not_a_dict", "missing_name"])
+    def test_ingredient_additives_invalid(self, additive_refs, ingredient, message):
+        """Test error handling for malformed ingredients."""
+        product_data = {
+            "additives": [],
+            "ingredients": [{"name": "E300", "id": "en:e300"}, ingredient],
+            **additive_refs
+        }
+        
+        with pytest.raises(ScoringError) as excinfo:
+            ScoringEngine._calculate_additives_score(product_data)
+        
+        assert message in str(excinfo.value)
+
     def test_scoring_error_propagation(self):
         """Test that errors from component scores propagate to the main calculation."""
         product_data = {
@@ -0,0 +1,33 @@
+"""Unit tests for the application settings."""
+import pytest
+from dataclasses import FrozenInstanceError
+
+from wecare.config import settings
+from wecare.config.settings import get_settings
+
+
+class TestSettings:
+    """Test suite for settings loading."""
+
+    def test_get_settings_is_cached(self):
+        """Test that settings are built once and shared."""
+        assert get_settings() is get_settings()
+
+    def test_settings_are_immutable(self):
+        """Test that the settings object cannot be modified."""
+        with pytest.raises(FrozenInstanceError):
+            get_settings().openai_model = "other"
+
+    def test_module_level_names(self):
+        """Test that module-level names mirror the settings object."""
+        current = get_settings()
+        assert settings.OPENAI_MODEL == current.openai_model
+        assert settings.SAFE_ADDITIVES is current.safe_additives
+        assert settings.LOG_LEVEL == current.log_level
+        assert settings.RESPONSE_CACHE_TTL == current.response_cache_ttl
+        assert settings.RESPONSE_CACHE_PATH == current.response_cache_path
+        assert settings.OPENAI_CONCURRENCY == current.openai_concurrency
+        assert settings.OPENAI_MAX_RETRIES == current.openai_max_retries
+        assert settings.COMMON_DIETS is current.common_diets
+        assert settings.COMMON_DIETS_SET == frozenset(current.common_diets)
+        assert "Peanuts" in settings.COMMON_ALLERGENS_SET
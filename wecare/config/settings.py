@@ -3,94 +3,135 @@ Configuration settings for the WeCare application.
 Loads settings from environment variables with sensible defaults.
 """
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import FrozenSet, Tuple
 
-# Base paths
-BASE_DIR = Path(__file__).resolve().parent.parent
 
-# OpenAI API settings
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
-OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "wecare/gpt-4o")
-LLM_API_BASE_URL = os.environ.get("LLM_API_BASE_URL", "https://llm.swe.along.pw")
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Application settings, read from the environment once."""
+    base_dir: Path
+    openai_api_key: str
+    openai_model: str
+    llm_api_base_url: str
+    openai_concurrency: int
+    openai_max_retries: int
+    response_cache_size: int
+    response_cache_ttl: float
+    response_cache_path: str
+    scoring_enabled: bool
+    common_diets: Tuple[str, ...]
+    common_allergens: Tuple[str, ...]
+    safe_additives: FrozenSet[str]
+    suspicious_additives: FrozenSet[str]
+    harmful_additives: FrozenSet[str]
+    log_format: str
+    log_level: str
 
-# Scoring settings
-SCORING_ENABLED = os.environ.get("SCORING_ENABLED", "True").lower() == "true"
 
-# Common dietary preferences
-COMMON_DIETS = [
-    "Vegetarian",
-    "Vegan",
-    "Gluten-Free",
-    "Keto",
-    "Low-Sugar",
-    "Low-Carb",
-    "Low-Fat",
-    "Low-Sodium",
-    "Lactose-Free",
-    "Pescatarian",
-    "Paleo"
-]
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the application settings on first use and return the same instance afterwards.
 
-# Common food allergens
-COMMON_ALLERGENS = [
-    "Peanuts",
-    "Tree Nuts",
-    "Milk",
-    "Eggs",
-    "Wheat",
-    "Soy",
-    "Fish",
-    "Shellfish",
-    "Sesame",
-    "Mustard",
-    "Celery",
-    "Lupin",
-    "Sulfites",
-    "Mollusks"
-]
+    Returns:
+        Settings loaded from the environment
+    """
+    return Settings(
+        # Base paths
+        base_dir=Path(__file__).resolve().parent.parent,
 
-# These are just placeholder values for configuration
-SAFE_ADDITIVES = [
-    "E100", "E101", "E300", "E304", "E306", "E307", "E308", 
-    "E309", "E322", "E330", "E331", "E332", "E333", "E334"
-]
+        # OpenAI API settings
+        openai_api_key=os.environ.get("OPENAI_API_KEY", ""),
+        openai_model=os.environ.get("OPENAI_MODEL", "wecare/gpt-4o"),
+        llm_api_base_url=os.environ.get("LLM_API_BASE_URL", "https://llm.swe.along.pw"),
+        # Most API requests one analyzer keeps in flight at a time
+        openai_concurrency=int(os.environ.get("OPENAI_CONCURRENCY", "8")),
+        # Retries of rate-limited, failed or timed-out API requests, with jittered exponential backoff
+        openai_max_retries=int(os.environ.get("OPENAI_MAX_RETRIES", "2")),
 
-SUSPICIOUS_ADDITIVES = [
-    "E102", "E104", "E110", "E122", "E124", "E129", "E211", 
-    "E249", "E250", "E251", "E252", "E621", "E920", "E954"
-]
+        # Number of AI responses kept in memory for repeated requests (0 disables caching)
+        response_cache_size=int(os.environ.get("RESPONSE_CACHE_SIZE", "10000")),
+        # Seconds an AI response stays valid in the cache (0 keeps it until evicted)
+        response_cache_ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "0")),
+        # SQLite file keeping AI responses across restarts (empty keeps them in memory only)
+        response_cache_path=os.environ.get("RESPONSE_CACHE_PATH", ""),
 
-HARMFUL_ADDITIVES = [
-    "E102", "E104", "E110", "E122", "E124", "E129", "E211", 
-    "E249", "E250", "E251", "E252", "E621", "E920", "E954"
-]
+        # Scoring settings
+        scoring_enabled=os.environ.get("SCORING_ENABLED", "True").lower() == "true",
 
-# Logging settings
-LOGGING = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "standard": {
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "level": "DEBUG",
-            "formatter": "standard",
-        },
-    },
-    "root": {
-        "handlers": ["console"],
-        "level": "INFO",
-    },
-    "loggers": {
-        "wecare": {
-            "handlers": ["console"],
-            "level": os.environ.get("WECARE_LOG_LEVEL", "INFO"),
-            "propagate": False,
-        },
-    },
-} 
\ No newline at end of file
+        # Common dietary preferences
+        common_diets=(
+            "Vegetarian",
+            "Vegan",
+            "Gluten-Free",
+            "Keto",
+            "Low-Sugar",
+            "Low-Carb",
+            "Low-Fat",
+            "Low-Sodium",
+            "Lactose-Free",
+            "Pescatarian",
+            "Paleo"
+        ),
+
+        # Common food allergens
+        common_allergens=(
+            "Peanuts",
+            "Tree Nuts",
+            "Milk",
+            "Eggs",
+            "Wheat",
+            "Soy",
+            "Fish",
+            "Shellfish",
+            "Sesame",
+            "Mustard",
+            "Celery",
+            "Lupin",
+            "Sulfites",
+            "Mollusks"
+        ),
+
+        # These are just placeholder values for configuration
+        safe_additives=frozenset({
+            "E100", "E101", "E300", "E304", "E306", "E307", "E308",
+            "E309", "E322", "E330", "E331", "E332", "E333", "E334"
+        }),
+        suspicious_additives=frozenset({
+            "E102", "E104", "E110", "E122", "E124", "E129", "E621",
+            "E920", "E954"
+        }),
+        harmful_additives=frozenset({
+            "E211", "E249", "E250", "E251", "E252"
+        }),
+
+        # Logging settings
+        log_format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        log_level=os.environ.get("WECARE_LOG_LEVEL", "INFO")
+    )
+
+
+# Module-level names kept for existing imports
+_settings = get_settings()
+
+BASE_DIR = _settings.base_dir
+OPENAI_API_KEY = _settings.openai_api_key
+OPENAI_MODEL = _settings.openai_model
+LLM_API_BASE_URL = _settings.llm_api_base_url
+OPENAI_CONCURRENCY = _settings.openai_concurrency
+OPENAI_MAX_RETRIES = _settings.openai_max_retries
+RESPONSE_CACHE_SIZE = _settings.response_cache_size
+RESPONSE_CACHE_TTL = _settings.response_cache_ttl
+RESPONSE_CACHE_PATH = _settings.response_cache_path
+SCORING_ENABLED = _settings.scoring_enabled
+COMMON_DIETS = _settings.common_diets
+COMMON_ALLERGENS = _settings.common_allergens
+COMMON_DIETS_SET = frozenset(COMMON_DIETS)
+COMMON_ALLERGENS_SET = frozenset(COMMON_ALLERGENS)
+SAFE_ADDITIVES = _settings.safe_additives
+SUSPICIOUS_ADDITIVES = _settings.suspicious_additives
+HARMFUL_ADDITIVES = _settings.harmful_additives
+LOG_FORMAT = _settings.log_format
+LOG_LEVEL = _settings.log_level
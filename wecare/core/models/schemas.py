@@ -2,40 +2,57 @@
 Data schemas for the WeCare application.
 Defines the structure of product data and AI integration responses.
 """
+import json
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Weight:
     """Product weight information."""
     value: float
     unit: str
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {"value": self.value, "unit": self.unit}
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Ingredient:
     """Product ingredient with safety classification."""
     name: str
     safety: str  # "safe", "suspicious", "harmful"
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {"name": self.name, "safety": self.safety}
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FatInfo:
     """Fat nutritional information."""
     total: float
     saturated: float
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {"total": self.total, "saturated": self.saturated}
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class CarbInfo:
     """Carbohydrate nutritional information."""
     total: float
     sugar: float
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {"total": self.total, "sugar": self.sugar}
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NutritionInfo:
     """Complete nutritional information for a product."""
     calories: float
@@ -46,8 +63,20 @@ class NutritionInfo:
     salt: float
     sodium: float
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "calories": self.calories,
+            "protein": self.protein,
+            "fat": self.fat.to_dict(),
+            "carbohydrates": self.carbohydrates.to_dict(),
+            "fiber": self.fiber,
+            "salt": self.salt,
+            "sodium": self.sodium
+        }
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Score:
     """Product quality score information."""
     total: int
@@ -55,8 +84,27 @@ class Score:
     nutrition_score: int
     additives_score: int
 
-
-@dataclass
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Score":
+        """Create a Score from its decoded JSON form."""
+        return cls(
+            total=data["total"],
+            category=data["category"],
+            nutrition_score=data["nutrition_score"],
+            additives_score=data["additives_score"]
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "total": self.total,
+            "category": self.category,
+            "nutrition_score": self.nutrition_score,
+            "additives_score": self.additives_score
+        }
+
+
+@dataclass(slots=True)
 class ProductInfo:
     """Core product information from external service."""
     id: str
@@ -70,23 +118,62 @@ class ProductInfo:
     additives: List[str] = field(default_factory=list)
     image_url: Optional[str] = None
 
-
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "id": self.id,
+            "barcode": self.barcode,
+            "name": self.name,
+            "manufacturer": self.manufacturer,
+            "weight": self.weight.to_dict(),
+            "ingredients": [ingredient.to_dict() for ingredient in self.ingredients],
+            "nutrition": self.nutrition.to_dict(),
+            "score": self.score.to_dict() if self.score is not None else None,
+            "additives": list(self.additives),
+            "image_url": self.image_url
+        }
+
+
+@dataclass(slots=True)
 class AllergenAnalysis:
     """Allergen analysis generated by AI."""
     detected_allergens: List[str]
     user_allergens_present: List[str]
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AllergenAnalysis":
+        """Create an AllergenAnalysis from its decoded JSON form."""
+        return cls(
+            detected_allergens=data["detected_allergens"],
+            user_allergens_present=data["user_allergens_present"]
+        )
 
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "detected_allergens": list(self.detected_allergens),
+            "user_allergens_present": list(self.user_allergens_present)
+        }
+
+
+@dataclass(frozen=True, slots=True)
 class DietCompatibility:
     """Diet compatibility information generated by AI."""
     diet: str
     compatible: bool
     reason: str
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DietCompatibility":
+        """Create a DietCompatibility from its decoded JSON form."""
+        return cls(diet=data["diet"], compatible=data["compatible"], reason=data["reason"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {"diet": self.diet, "compatible": self.compatible, "reason": self.reason}
+
 
-@dataclass
+@dataclass(slots=True)
 class ProductAnalysis:
     """Complete product analysis including AI-generated components."""
     product: ProductInfo
@@ -94,9 +181,18 @@ class ProductAnalysis:
     diet_compatibility: List[DietCompatibility]
     scan_timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "product": self.product.to_dict(),
+            "allergens_analysis": self.allergens_analysis.to_dict(),
+            "diet_compatibility": [diet.to_dict() for diet in self.diet_compatibility],
+            "scan_timestamp": self.scan_timestamp
+        }
+
 
 # AI Service Input/Output Schemas
-@dataclass
+@dataclass(slots=True)
 class AIServiceInput:
     """Input data for AI service."""
     product_info: Dict[str, Any]  # Parsed from external service
@@ -105,9 +201,49 @@ class AIServiceInput:
     calculate_score: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class AIServiceOutput:
     """Output data from AI service."""
     allergens_analysis: AllergenAnalysis
     diet_compatibility: List[DietCompatibility]
-    score: Optional[Score] = None 
\ No newline at end of file
+    score: Optional[Score] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AIServiceOutput":
+        """Create an AIServiceOutput from its decoded JSON form.
+
+        The ``score`` key is optional and may be null; all other keys are required.
+        """
+        score = data.get("score")
+        return cls(
+            allergens_analysis=AllergenAnalysis.from_dict(data["allergens_analysis"]),
+            diet_compatibility=[DietCompatibility.from_dict(item) for item in data["diet_compatibility"]],
+            score=Score.from_dict(score) if score is not None else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a plain dict for JSON serialization."""
+        return {
+            "allergens_analysis": self.allergens_analysis.to_dict(),
+            "diet_compatibility": [diet.to_dict() for diet in self.diet_compatibility],
+            "score": self.score.to_dict() if self.score is not None else None
+        }
+
+    def copy(self) -> "AIServiceOutput":
+        """Return a copy that shares no mutable state with this output.
+
+        DietCompatibility and Score are frozen, so those instances are shared.
+        """
+        return AIServiceOutput(
+            allergens_analysis=AllergenAnalysis(
+                detected_allergens=list(self.allergens_analysis.detected_allergens),
+                user_allergens_present=list(self.allergens_analysis.user_allergens_present)
+            ),
+            diet_compatibility=list(self.diet_compatibility),
+            score=self.score
+        )
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "AIServiceOutput":
+        """Create an AIServiceOutput from a JSON document given as text or bytes."""
+        return cls.from_dict(json.loads(data)) 
\ No newline at end of file
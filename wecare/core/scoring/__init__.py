@@ -1,5 +1,5 @@
 """Scoring module for product quality assessment."""
 
-from wecare.core.scoring.scoring_engine import ScoringEngine
+from wecare.core.scoring.scoring_engine import ScoringEngine, ScoringInput
 
-__all__ = ["ScoringEngine"] 
\ No newline at end of file
+__all__ = ["ScoringEngine", "ScoringInput"] 
\ No newline at end of file
@@ -2,7 +2,11 @@
 Scoring engine for evaluating product quality.
 Used when scoring is not provided by external service.
 """
-from typing import Dict, List, Tuple, Any, Optional
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Any, Optional, FrozenSet, Iterable, Mapping, Union
 import logging
 
 from wecare.core.models.schemas import Score, NutritionInfo, Ingredient
@@ -10,81 +14,201 @@ from wecare.core.models.schemas import Score, NutritionInfo, Ingredient
 
 logger = logging.getLogger(__name__)
 
+# Additive class bits; an additive listed in several reference sets carries several bits
+_SAFE = 1
+_SUSPICIOUS = 2
+_HARMFUL = 4
+
+# Safe, suspicious and harmful additive reference sets
+ReferenceAdditives = Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]
+
+
+@lru_cache(maxsize=32)
+def _additive_classes(safe_additives: FrozenSet[str], suspicious_additives: FrozenSet[str],
+                      harmful_additives: FrozenSet[str]) -> Dict[str, int]:
+    """Map each reference additive to its class bits, built once per set of references."""
+    classes = dict.fromkeys(safe_additives, _SAFE)
+    for code in suspicious_additives:
+        classes[code] = classes.get(code, 0) | _SUSPICIOUS
+    for code in harmful_additives:
+        classes[code] = classes.get(code, 0) | _HARMFUL
+    return classes
+
+
+@lru_cache(maxsize=1024)
+def _cached_score(scoring_input: "ScoringInput") -> Score:
+    """Score input equal to an earlier one from cache; Score is frozen, so it is shared."""
+    return ScoringEngine._score_input(scoring_input)
+
 
 class ScoringError(Exception):
     """Exception raised for errors in the scoring process."""
     pass
 
 
+@dataclass(frozen=True, slots=True)
+class ScoringInput:
+    """Validated scoring data for one product, with typed attribute access."""
+    protein: float
+    saturated_fat: float
+    sugar: float
+    fiber: float
+    salt: float
+    calories: float
+    additives: FrozenSet[str]
+    safe_additives: FrozenSet[str]
+    suspicious_additives: FrozenSet[str]
+    harmful_additives: FrozenSet[str]
+
+    @classmethod
+    def from_dict(cls, product_data: Dict[str, Any],
+                  reference_additives: Optional[ReferenceAdditives] = None) -> "ScoringInput":
+        """Build scoring input from a product data dictionary.
+        
+        Args:
+            product_data: Dictionary containing product information
+            reference_additives: Reference sets used for lists missing from product_data
+            
+        Returns:
+            ScoringInput with the values needed for scoring
+            
+        Raises:
+            ScoringError: If required product data is missing or invalid
+        """
+        try:
+            nutrition = ScoringEngine._nutrition_values(product_data)
+        except Exception as e:
+            raise ScoringError(f"Failed to calculate nutrition score: {str(e)}")
+        
+        try:
+            additives = ScoringEngine._additive_sets(product_data, reference_additives)
+        except Exception as e:
+            raise ScoringError(f"Failed to calculate additives score: {str(e)}")
+        
+        return cls(*nutrition, *additives)
+
+
+def _category_table(categories: Mapping[Tuple[int, int], str]) -> Tuple[str, ...]:
+    """Expand (low, high) score ranges into a 101-entry score -> category table."""
+    table = [""] * 101
+    for (low, high), category in categories.items():
+        table[low:high + 1] = [category] * (high - low + 1)
+    return tuple(table)
+
+
 class ScoringEngine:
     """Engine for calculating product quality scores."""
     
     # Score category thresholds
-    SCORE_CATEGORIES = {
+    SCORE_CATEGORIES = MappingProxyType({
         (81, 100): "Excellent",
         (61, 80): "Good",
         (41, 60): "Average",
         (21, 40): "Low Quality",
         (0, 20): "Very Low Quality"
-    }
+    })
+    
+    # Category of every valid score, indexed by score
+    _CATEGORY_BY_SCORE = _category_table(SCORE_CATEGORIES)
     
     # Nutritional value weights (60% of total)
-    NUTRITION_WEIGHTS = {
+    NUTRITION_WEIGHTS = MappingProxyType({
         "proteins": 0.2,
         "fats": 0.2,
         "carbs": 0.2,
         "fiber": 0.1,
         "salt": 0.1,
         "calories": 0.2
-    }
+    })
+    
+    # NUTRITION_WEIGHTS scaled by 10 to integers, in the order component scores
+    # are computed; component scores are 0/5/10, so the weighted sum is an exact
+    # integer on the 0-100 scale
+    _NUTRITION_COMPONENTS = ("proteins", "fats", "carbs", "fiber", "salt", "calories")
+    _NUTRITION_LABELS = ("Protein", "Saturated fat", "Sugar", "Fiber", "Salt", "Calorie")
+    _NUTRITION_WEIGHTS_X10 = tuple(
+        round(weight * 10) for weight in map(NUTRITION_WEIGHTS.__getitem__, _NUTRITION_COMPONENTS)
+    )
     
     # Additives weights (40% of total)
-    ADDITIVES_WEIGHTS = {
+    ADDITIVES_WEIGHTS = MappingProxyType({
         "safe": 0.4,
         "suspicious": 0.3,
         "harmful": 0.3
-    }
+    })
+    _ADDITIVES_WEIGHTS_X10 = tuple(
+        round(weight * 10) for weight in map(ADDITIVES_WEIGHTS.__getitem__, ("safe", "suspicious", "harmful"))
+    )
     
     # Overall weights
-    OVERALL_WEIGHTS = {
+    OVERALL_WEIGHTS = MappingProxyType({
         "nutrition": 0.6,
         "additives": 0.4
-    }
+    })
+    _OVERALL_WEIGHTS_X10 = tuple(
+        round(weight * 10) for weight in map(OVERALL_WEIGHTS.__getitem__, ("nutrition", "additives"))
+    )
+    
+    # Nutrition content thresholds (these would ideally be calibrated by nutritionists).
+    # The tables are read-only views so the folded copies below cannot go stale
+    PROTEIN_THRESHOLDS = MappingProxyType({"high": 5.0, "medium": 2.5})  # grams per 100g
+    FAT_THRESHOLDS = MappingProxyType({"high": 17.5, "medium": 5.0})  # grams per 100g
+    SATURATED_FAT_THRESHOLDS = MappingProxyType({"high": 5.0, "medium": 1.5})  # grams per 100g
+    SUGAR_THRESHOLDS = MappingProxyType({"high": 22.5, "medium": 5.0})  # grams per 100g
+    FIBER_THRESHOLDS = MappingProxyType({"high": 6.0, "medium": 3.0})  # grams per 100g
+    SALT_THRESHOLDS = MappingProxyType({"high": 1.5, "medium": 0.3})  # grams per 100g
+    CALORIE_THRESHOLDS = MappingProxyType({"high": 400, "medium": 200})  # kcal per 100g
+    
+    # Product data keys of the additive reference lists, with their error labels
+    _REFERENCE_KEYS = (
+        ("safe_additives", "Safe"),
+        ("suspicious_additives", "Suspicious"),
+        ("harmful_additives", "Harmful")
+    )
     
-    # Nutrition content thresholds (these would ideally be calibrated by nutritionists)
-    PROTEIN_THRESHOLDS = {"high": 5.0, "medium": 2.5}  # grams per 100g
-    FAT_THRESHOLDS = {"high": 17.5, "medium": 5.0}  # grams per 100g
-    SATURATED_FAT_THRESHOLDS = {"high": 5.0, "medium": 1.5}  # grams per 100g
-    SUGAR_THRESHOLDS = {"high": 22.5, "medium": 5.0}  # grams per 100g
-    FIBER_THRESHOLDS = {"high": 6.0, "medium": 3.0}  # grams per 100g
-    SALT_THRESHOLDS = {"high": 1.5, "medium": 0.3}  # grams per 100g
-    CALORIE_THRESHOLDS = {"high": 400, "medium": 200}  # kcal per 100g
+    # Flattened (medium, high) thresholds in _NUTRITION_COMPONENTS order
+    _NUTRITION_BANDS = (
+        PROTEIN_THRESHOLDS["medium"], PROTEIN_THRESHOLDS["high"],
+        SATURATED_FAT_THRESHOLDS["medium"], SATURATED_FAT_THRESHOLDS["high"],
+        SUGAR_THRESHOLDS["medium"], SUGAR_THRESHOLDS["high"],
+        FIBER_THRESHOLDS["medium"], FIBER_THRESHOLDS["high"],
+        SALT_THRESHOLDS["medium"], SALT_THRESHOLDS["high"],
+        CALORIE_THRESHOLDS["medium"], CALORIE_THRESHOLDS["high"]
+    )
     
     @staticmethod
     def get_score_category(score: int) -> str:
         """Get score category based on numeric score.
         
         Args:
-            score: Numeric score (0-100)
+            score: Numeric score (0-100); integral floats such as 50.0 are accepted
             
         Returns:
             Category string
             
         Raises:
-            ScoringError: If score is outside the valid range
+            ScoringError: If score is not a whole number or is outside the valid range
         """
-        for score_range, category in ScoringEngine.SCORE_CATEGORIES.items():
-            if score_range[0] <= score <= score_range[1]:
-                return category
-        
-        raise ScoringError(f"Score {score} is outside the valid range (0-100)")
+        if not 0 <= score <= 100:
+            raise ScoringError(f"Score {score} is outside the valid range (0-100)")
+        if not isinstance(score, int):
+            # The category table is indexed by whole scores
+            if not (isinstance(score, float) and score.is_integer()):
+                raise ScoringError(f"Score {score} is not a whole number")
+            score = int(score)
+        
+        return ScoringEngine._CATEGORY_BY_SCORE[score]
     
     @classmethod
-    def calculate_score(cls, product_data: Dict[str, Any]) -> Score:
+    def calculate_score(cls, product_data: Union[Dict[str, Any], ScoringInput],
+                        reference_additives: Optional[ReferenceAdditives] = None) -> Score:
         """Calculate product quality score.
         
         Args:
-            product_data: Dictionary containing product information
+            product_data: Dictionary containing product information, or an
+                already validated ScoringInput
+            reference_additives: Reference sets, from ``reference_lists``, used
+                for additive lists missing from product_data
             
         Returns:
             Score object with total score and category
@@ -95,23 +219,61 @@ class ScoringEngine:
         if not product_data:
             raise ScoringError("Product data is missing")
         
+        if not isinstance(product_data, ScoringInput):
+            product_data = ScoringInput.from_dict(product_data, reference_additives)
+        
+        return _cached_score(product_data)
+    
+    @classmethod
+    def calculate_scores(cls, products: List[Union[Dict[str, Any], ScoringInput]],
+                         reference_additives: Optional[ReferenceAdditives] = None) -> List[Score]:
+        """Calculate quality scores for several products.
+        
+        Products with the same scoring data share one cached Score, and the
+        additive classification table is built once per set of reference lists.
+        
+        Args:
+            products: Product dictionaries or validated ScoringInputs
+            reference_additives: Reference sets used for additive lists missing
+                from a product
+            
+        Returns:
+            One Score per product, in input order
+            
+        Raises:
+            ScoringError: If any product's data is missing or invalid
+        """
+        calculate_score = cls.calculate_score
+        return [calculate_score(product_data, reference_additives) for product_data in products]
+    
+    @classmethod
+    def _score_input(cls, product_data: ScoringInput) -> Score:
+        """Calculate the score of validated scoring input.
+        
+        Raises:
+            ScoringError: If a nutrition value cannot be scored
+        """
         # Calculate nutrition score (out of 100)
-        try:
-            nutrition_score = cls._calculate_nutrition_score(product_data)
-        except Exception as e:
-            raise ScoringError(f"Failed to calculate nutrition score: {str(e)}")
+        nutrition_score = cls._weighted_nutrition_score(
+            product_data.protein,
+            product_data.saturated_fat,
+            product_data.sugar,
+            product_data.fiber,
+            product_data.salt,
+            product_data.calories
+        )
         
         # Calculate additives score (out of 100)
-        try:
-            additives_score = cls._calculate_additives_score(product_data)
-        except Exception as e:
-            raise ScoringError(f"Failed to calculate additives score: {str(e)}")
+        additives_score = cls._weighted_additives_score(
+            product_data.additives,
+            product_data.safe_additives,
+            product_data.suspicious_additives,
+            product_data.harmful_additives
+        )
         
         # Calculate total score
-        total_score = round(
-            (nutrition_score * cls.OVERALL_WEIGHTS["nutrition"]) +
-            (additives_score * cls.OVERALL_WEIGHTS["additives"])
-        )
+        nutrition_weight, additives_weight = cls._OVERALL_WEIGHTS_X10
+        total_score = round((nutrition_score * nutrition_weight + additives_score * additives_weight) / 10)
         
         # Get category
         category = cls.get_score_category(total_score)
@@ -119,12 +281,12 @@ class ScoringEngine:
         return Score(
             total=total_score,
             category=category,
-            nutrition_score=round(nutrition_score),
-            additives_score=round(additives_score)
+            nutrition_score=nutrition_score,
+            additives_score=additives_score
         )
     
     @classmethod
-    def _calculate_nutrition_score(cls, product_data: Dict[str, Any]) -> float:
+    def _calculate_nutrition_score(cls, product_data: Dict[str, Any]) -> int:
         """Calculate nutrition score component based on WHO recommendations.
         
         Args:
@@ -133,6 +295,18 @@ class ScoringEngine:
         Returns:
             Nutrition score (0-100)
             
+        Raises:
+            ScoringError: If nutrition data is missing or invalid
+        """
+        return cls._weighted_nutrition_score(*cls._nutrition_values(product_data))
+    
+    @classmethod
+    def _nutrition_values(cls, product_data: Dict[str, Any]) -> Tuple[float, float, float, float, float, float]:
+        """Extract the scored nutrition values from product data.
+        
+        Returns:
+            Protein, saturated fat, sugar, fiber, salt and calories, per 100g
+            
         Raises:
             ScoringError: If nutrition data is missing or invalid
         """
@@ -141,167 +315,131 @@ class ScoringEngine:
         if not nutrition:
             raise ScoringError("Nutrition information is missing")
         
-        # Calculate individual component scores
-        scores = {}
-        
-        try:
-            scores["proteins"] = cls._score_protein(nutrition)
-            scores["fats"] = cls._score_fats(nutrition)
-            scores["carbs"] = cls._score_carbs(nutrition)
-            scores["fiber"] = cls._score_fiber(nutrition)
-            scores["salt"] = cls._score_salt(nutrition)
-            scores["calories"] = cls._score_calories(nutrition)
-        except Exception as e:
-            raise ScoringError(f"Error in nutrition scoring: {str(e)}")
-        
-        # Calculate weighted nutrition score
-        weighted_score = sum(
-            scores[component] * cls.NUTRITION_WEIGHTS[component]
-            for component in scores
-        )
-        
-        # Convert to scale of 0-100
-        return weighted_score * 10
-    
-    @classmethod
-    def _score_protein(cls, nutrition: Dict[str, Any]) -> float:
-        """Score protein content from 0-10.
+        if not isinstance(nutrition, dict):
+            raise ScoringError("Error in nutrition scoring: Nutrition information is not in the expected format")
         
-        Raises:
-            ScoringError: If protein data is missing
-        """
         if "protein" not in nutrition:
-            raise ScoringError("Protein information is missing")
-            
-        protein = nutrition["protein"]
-        
-        if protein >= cls.PROTEIN_THRESHOLDS["high"]:
-            return 10.0  # High protein content
-        elif protein >= cls.PROTEIN_THRESHOLDS["medium"]:
-            return 5.0   # Medium protein content
-        else:
-            return 0.0   # Low protein content
-    
-    @classmethod
-    def _score_fats(cls, nutrition: Dict[str, Any]) -> float:
-        """Score fat content from 0-10.
+            raise ScoringError("Error in nutrition scoring: Protein information is missing")
         
-        Raises:
-            ScoringError: If fat data is missing or invalid
-        """
         if "fat" not in nutrition:
-            raise ScoringError("Fat information is missing")
-            
+            raise ScoringError("Error in nutrition scoring: Fat information is missing")
         fat_info = nutrition["fat"]
-        
         if not isinstance(fat_info, dict):
-            raise ScoringError("Fat information is not in the expected format")
-            
+            raise ScoringError("Error in nutrition scoring: Fat information is not in the expected format")
         if "saturated" not in fat_info:
-            raise ScoringError("Saturated fat information is missing")
-            
-        saturated_fat = fat_info["saturated"]
-        
-        if saturated_fat <= cls.SATURATED_FAT_THRESHOLDS["medium"]:
-            return 10.0  # Low saturated fat
-        elif saturated_fat <= cls.SATURATED_FAT_THRESHOLDS["high"]:
-            return 5.0   # Medium saturated fat
-        else:
-            return 0.0   # High saturated fat
-    
-    @classmethod
-    def _score_carbs(cls, nutrition: Dict[str, Any]) -> float:
-        """Score carbohydrate content from 0-10.
+            raise ScoringError("Error in nutrition scoring: Saturated fat information is missing")
         
-        Raises:
-            ScoringError: If carbohydrate data is missing or invalid
-        """
         if "carbohydrates" not in nutrition:
-            raise ScoringError("Carbohydrate information is missing")
-            
+            raise ScoringError("Error in nutrition scoring: Carbohydrate information is missing")
         carb_info = nutrition["carbohydrates"]
-        
         if not isinstance(carb_info, dict):
-            raise ScoringError("Carbohydrate information is not in the expected format")
-            
+            raise ScoringError("Error in nutrition scoring: Carbohydrate information is not in the expected format")
         if "sugar" not in carb_info:
-            raise ScoringError("Sugar information is missing")
-            
-        sugar = carb_info["sugar"]
-        
-        if sugar <= cls.SUGAR_THRESHOLDS["medium"]:
-            return 10.0  # Low sugar content
-        elif sugar <= cls.SUGAR_THRESHOLDS["high"]:
-            return 5.0   # Medium sugar content
-        else:
-            return 0.0   # High sugar content
+            raise ScoringError("Error in nutrition scoring: Sugar information is missing")
+        
+        if "fiber" not in nutrition:
+            raise ScoringError("Error in nutrition scoring: Fiber information is missing")
+        if "salt" not in nutrition:
+            raise ScoringError("Error in nutrition scoring: Salt information is missing")
+        if "calories" not in nutrition:
+            raise ScoringError("Error in nutrition scoring: Calorie information is missing")
+        
+        values = (
+            nutrition["protein"],
+            fat_info["saturated"],
+            carb_info["sugar"],
+            nutrition["fiber"],
+            nutrition["salt"],
+            nutrition["calories"]
+        )
+        # Checked once here so scoring can run without a try block
+        for value, label in zip(values, cls._NUTRITION_LABELS):
+            if not isinstance(value, (int, float)):
+                raise ScoringError(f"Error in nutrition scoring: {label} value is not a number")
+        
+        return values
     
     @classmethod
-    def _score_fiber(cls, nutrition: Dict[str, Any]) -> float:
-        """Score fiber content from 0-10.
+    def _weighted_nutrition_score(cls, protein: float, saturated_fat: float, sugar: float,
+                                  fiber: float, salt: float, calories: float) -> int:
+        """Combine nutrition values into a score (0-100)."""
+        (protein_medium, protein_high, saturated_fat_medium, saturated_fat_high,
+         sugar_medium, sugar_high, fiber_medium, fiber_high,
+         salt_medium, salt_high, calories_medium, calories_high) = cls._NUTRITION_BANDS
+        
+        # Component scores: 10 in the good band, 5 in the medium band, 0 otherwise
+        scores = (
+            10 if protein >= protein_high else 5 if protein >= protein_medium else 0,
+            10 if saturated_fat <= saturated_fat_medium else 5 if saturated_fat <= saturated_fat_high else 0,
+            10 if sugar <= sugar_medium else 5 if sugar <= sugar_high else 0,
+            10 if fiber >= fiber_high else 5 if fiber >= fiber_medium else 0,
+            10 if salt <= salt_medium else 5 if salt <= salt_high else 0,
+            10 if calories <= calories_medium else 5 if calories <= calories_high else 0
+        )
         
-        Raises:
-            ScoringError: If fiber data is missing
-        """
-        if "fiber" not in nutrition:
-            raise ScoringError("Fiber information is missing")
-            
-        fiber = nutrition["fiber"]
-        
-        if fiber >= cls.FIBER_THRESHOLDS["high"]:
-            return 10.0  # High fiber content
-        elif fiber >= cls.FIBER_THRESHOLDS["medium"]:
-            return 5.0   # Medium fiber content
-        else:
-            return 0.0   # Low fiber content
+        # Weighted nutrition score as a single integer dot product, on the 0-100 scale
+        return math.sumprod(scores, cls._NUTRITION_WEIGHTS_X10)
     
     @classmethod
-    def _score_salt(cls, nutrition: Dict[str, Any]) -> float:
-        """Score salt content from 0-10.
+    def _calculate_additives_score(cls, product_data: Dict[str, Any],
+                                   reference_additives: Optional[ReferenceAdditives] = None) -> int:
+        """Calculate additives score based on E-codes classification.
         
+        Args:
+            product_data: Dictionary containing product additives information
+            reference_additives: Reference sets used for lists missing from product_data
+            
+        Returns:
+            Additives score (0-100)
+            
         Raises:
-            ScoringError: If salt data is missing
+            ScoringError: If additives data is invalid
         """
-        if "salt" not in nutrition:
-            raise ScoringError("Salt information is missing")
-            
-        salt = nutrition["salt"]
-        
-        if salt <= cls.SALT_THRESHOLDS["medium"]:
-            return 10.0  # Low salt content
-        elif salt <= cls.SALT_THRESHOLDS["high"]:
-            return 5.0   # Medium salt content
-        else:
-            return 0.0   # High salt content
+        return cls._weighted_additives_score(*cls._additive_sets(product_data, reference_additives))
     
-    @classmethod
-    def _score_calories(cls, nutrition: Dict[str, Any]) -> float:
-        """Score calorie content from 0-10.
+    @staticmethod
+    def clear_score_cache() -> None:
+        """Drop all memoized scores to free memory or reset cache statistics.
         
-        Raises:
-            ScoringError: If calorie data is missing
+        Scores are cached by the full scoring input, reference sets included, so
+        products and reference lists can change without clearing the cache.
+        Thresholds and weights are read-only class constants and never require it.
         """
-        if "calories" not in nutrition:
-            raise ScoringError("Calorie information is missing")
+        _cached_score.cache_clear()
+    
+    @classmethod
+    def reference_lists(cls, safe_additives: Iterable[str], suspicious_additives: Iterable[str],
+                        harmful_additives: Iterable[str]) -> ReferenceAdditives:
+        """Freeze additive reference lists for use with ``calculate_score``.
+        
+        Callers can build the sets once at startup and pass them with each
+        call instead of adding the lists to every product.
+        
+        Args:
+            safe_additives: E-codes of safe additives
+            suspicious_additives: E-codes of suspicious additives
+            harmful_additives: E-codes of harmful additives
             
-        calories = nutrition["calories"]
-        
-        if calories <= cls.CALORIE_THRESHOLDS["medium"]:
-            return 10.0  # Low calorie content
-        elif calories <= cls.CALORIE_THRESHOLDS["high"]:
-            return 5.0   # Medium calorie content
-        else:
-            return 0.0   # High calorie content
+        Returns:
+            Safe, suspicious and harmful reference sets
+        """
+        return (
+            cls._as_frozenset(safe_additives),
+            cls._as_frozenset(suspicious_additives),
+            cls._as_frozenset(harmful_additives)
+        )
     
     @classmethod
-    def _calculate_additives_score(cls, product_data: Dict[str, Any]) -> float:
-        """Calculate additives score based on E-codes classification.
+    def _additive_sets(cls, product_data: Dict[str, Any],
+                       reference_additives: Optional[ReferenceAdditives] = None) -> Tuple[FrozenSet[str], ...]:
+        """Extract the product additives and the reference sets from product data.
         
         Args:
             product_data: Dictionary containing product additives information
+            reference_additives: Reference sets used for lists missing from product_data
             
         Returns:
-            Additives score (0-100)
+            All product additives, then the safe, suspicious and harmful references
             
         Raises:
             ScoringError: If additives data is invalid
@@ -313,88 +451,66 @@ class ScoringEngine:
         additives = product_data.get("additives", [])
         ingredients = product_data.get("ingredients", [])
         
-        # Check for required additive lists
-        if "safe_additives" not in product_data:
-            raise ScoringError("Safe additives reference list is missing")
-        if "suspicious_additives" not in product_data:
-            raise ScoringError("Suspicious additives reference list is missing")
-        if "harmful_additives" not in product_data:
-            raise ScoringError("Harmful additives reference list is missing")
-        
-        # Get lists of safe, suspicious, and harmful additives
-        safe_additives = set(product_data["safe_additives"])
-        suspicious_additives = set(product_data["suspicious_additives"])
-        harmful_additives = set(product_data["harmful_additives"])
-        
-        # Extract additives from ingredient list
-        ingredient_additives = []
-        for ingredient in ingredients:
-            if not isinstance(ingredient, dict):
-                raise ScoringError("Ingredient data is not in the expected format")
-                
-            if "name" not in ingredient:
-                raise ScoringError("Ingredient name is missing")
-                
-            if ingredient["name"].startswith("E"):
-                ingredient_additives.append(ingredient["name"])
-        
-        # Combine all additives
-        all_additives = set(additives + ingredient_additives)
-        
-        # Calculate scores for each category
-        safe_score = cls._score_safe_additives(all_additives, safe_additives)
-        suspicious_score = cls._score_suspicious_additives(all_additives, suspicious_additives)
-        harmful_score = cls._score_harmful_additives(all_additives, harmful_additives)
-        
-        # Calculate weighted additives score
-        weighted_score = (
-            safe_score * cls.ADDITIVES_WEIGHTS["safe"] +
-            suspicious_score * cls.ADDITIVES_WEIGHTS["suspicious"] +
-            harmful_score * cls.ADDITIVES_WEIGHTS["harmful"]
-        )
-        
-        # Convert to scale of 0-100
-        return weighted_score * 10
-    
-    @staticmethod
-    def _score_safe_additives(all_additives: set, safe_additives: set) -> float:
-        """Score safe additives from 0-10."""
-        if not all_additives:
-            # No additives is neutral for this score (product has no additives)
-            return 5.0
-        
-        # Check if all additives are safe
-        if all_additives.issubset(safe_additives):
-            return 10.0  # Only beneficial additives
-        
-        # Check if any additives are safe
-        if safe_additives.intersection(all_additives):
-            return 5.0  # Some safe additives
-        
-        return 0.0  # No safe additives
+        # Reference lists given with the product take precedence over the ones
+        # passed in; a list missing from both is an error
+        references = []
+        for index, (key, label) in enumerate(cls._REFERENCE_KEYS):
+            if key in product_data:
+                references.append(cls._as_frozenset(product_data[key]))
+            elif reference_additives is not None:
+                references.append(reference_additives[index])
+            else:
+                raise ScoringError(f"{label} additives reference list is missing")
+        
+        # Combine product additives with E-codes from the ingredient list in one
+        # pass; malformed ingredients are diagnosed only when that pass fails
+        all_additives = set(additives)
+        try:
+            all_additives.update(
+                name for ingredient in ingredients if (name := ingredient["name"])[:1] == "E"
+            )
+        except (TypeError, KeyError):
+            for ingredient in ingredients:
+                if not isinstance(ingredient, dict):
+                    raise ScoringError("Ingredient data is not in the expected format")
+                    
+                if "name" not in ingredient:
+                    raise ScoringError("Ingredient name is missing")
+            raise
+        
+        return (frozenset(all_additives), *references)
     
-    @staticmethod
-    def _score_suspicious_additives(all_additives: set, suspicious_additives: set) -> float:
-        """Score suspicious additives from 0-10."""
+    @classmethod
+    def _weighted_additives_score(cls, all_additives: FrozenSet[str], safe_additives: FrozenSet[str],
+                                  suspicious_additives: FrozenSet[str],
+                                  harmful_additives: FrozenSet[str]) -> int:
+        """Combine additive classifications into a score (0-100)."""
+        safe_weight, suspicious_weight, harmful_weight = cls._ADDITIVES_WEIGHTS_X10
         if not all_additives:
-            # No additives is neutral for this score (product has no additives)
-            return 5.0
-        
-        # Check if no additives are suspicious
-        if not suspicious_additives.intersection(all_additives):
-            return 10.0  # No suspicious additives
-        
-        return 0.0  # Has suspicious additives
+            # No additives is neutral for every category
+            return 5 * (safe_weight + suspicious_weight + harmful_weight)
+        
+        # Classify every additive with one lookup, counting safe ones and
+        # collecting which other classes are present
+        classes = _additive_classes(safe_additives, suspicious_additives, harmful_additives)
+        safe_count = 0
+        present = 0
+        for code in all_additives:
+            additive_class = classes.get(code, 0)
+            safe_count += additive_class & _SAFE
+            present |= additive_class
+        
+        # Only safe additives: 10, some safe additives: 5, none: 0
+        safe_score = 10 if safe_count == len(all_additives) else 5 if safe_count else 0
+        # No suspicious additives: 10, otherwise 0
+        suspicious_score = 0 if present & _SUSPICIOUS else 10
+        # No harmful additives: 10, otherwise 0
+        harmful_score = 0 if present & _HARMFUL else 10
+        
+        # Weighted additives score, on the 0-100 scale
+        return safe_score * safe_weight + suspicious_score * suspicious_weight + harmful_score * harmful_weight
     
     @staticmethod
-    def _score_harmful_additives(all_additives: set, harmful_additives: set) -> float:
-        """Score harmful additives from 0-10."""
-        if not all_additives:
-            # No additives is neutral for this score (product has no additives)
-            return 5.0
-        
-        # Check if no additives are harmful
-        if not harmful_additives.intersection(all_additives):
-            return 10.0  # No harmful additives
-        
-        return 0.0  # Has harmful additives 
\ No newline at end of file
+    def _as_frozenset(values: Any) -> frozenset:
+        """Return the values as a frozenset, reusing one that is already frozen."""
+        return values if isinstance(values, frozenset) else frozenset(values)
@@ -6,9 +6,12 @@ This script demonstrates how to:
 2. Send it for analysis to ChatGPT
 3. Get allergen and diet compatibility results
 """
+import asyncio
 import json
+import logging
 import os
 import sys
+from itertools import islice
 from typing import Dict, List, Any
 
 # Add the project root to the path so Python can find the modules
@@ -28,6 +31,10 @@ SAFE_ADDITIVES = settings.SAFE_ADDITIVES
 SUSPICIOUS_ADDITIVES = settings.SUSPICIOUS_ADDITIVES
 HARMFUL_ADDITIVES = settings.HARMFUL_ADDITIVES
 
+# Scoring references frozen once and given to the analyzer, instead of being
+# added to every product
+REFERENCE_ADDITIVES = ScoringEngine.reference_lists(SAFE_ADDITIVES, SUSPICIOUS_ADDITIVES, HARMFUL_ADDITIVES)
+
 # Define a custom guided JSON template for consistent AI responses
 GUIDED_JSON_TEMPLATE = {
     "allergens_analysis": {
@@ -125,17 +132,29 @@ SAMPLE_PRODUCT = {
         "sodium": 0.288
     },
     "additives": ["E330 (citric acid)"],
-    "image_url": "https://images.openfoodfacts.org/images/products/073/762/806/4502/front_en.6.400.jpg",
-    # Add reference lists for scoring calculation
-    "safe_additives": SAFE_ADDITIVES,
-    "suspicious_additives": SUSPICIOUS_ADDITIVES,
-    "harmful_additives": HARMFUL_ADDITIVES
+    "image_url": "https://images.openfoodfacts.org/images/products/073/762/806/4502/front_en.6.400.jpg"
+}
+
+# Case variants of the sample product, built once. Nothing below modifies
+# them, so cases 1 and 3 share one dict and case 2 only adds a score.
+PRODUCT_WITHOUT_SCORE = {key: value for key, value in SAMPLE_PRODUCT.items() if key != "score"}
+PRODUCT_WITH_SCORE = {
+    **PRODUCT_WITHOUT_SCORE,
+    "score": {
+        "total": 83,
+        "category": "Excellent",
+        "nutrition_score": 51,
+        "additives_score": 32
+    }
 }
 
 # Sample user preferences
 USER_ALLERGENS = ["Peanuts", "Shellfish"]
 USER_DIETS = ["Vegetarian", "Low-Sugar"]
 
+# Send the cases through the cheaper, slower Batch API instead of real-time requests
+BATCH_MODE = os.environ.get("WECARE_BATCH_MODE", "False").lower() == "true"
+
 
 def main():
     """Run the example."""
@@ -150,16 +169,14 @@ def main():
     
     # Create product analyzer with settings and guided JSON template
     logger.info("Creating ProductAnalyzer with guided JSON template for consistent AI responses")
-    analyzer = ProductAnalyzer(guided_json=GUIDED_JSON_TEMPLATE)
+    analyzer = ProductAnalyzer(
+        guided_json=GUIDED_JSON_TEMPLATE, batch_mode=BATCH_MODE, reference_additives=REFERENCE_ADDITIVES
+    )
     
     # First case: product with score missing - will use GPT to generate score
     logger.info("CASE 1: Analyzing product with missing score - GPT will generate")
-    product_without_score = SAMPLE_PRODUCT.copy()
-    if "score" in product_without_score:
-        del product_without_score["score"]
-    
-    result1 = analyzer.analyze_product(
-        product_info=product_without_score,
+    case1 = dict(
+        product_info=PRODUCT_WITHOUT_SCORE,
         user_allergens=USER_ALLERGENS,
         user_diets=USER_DIETS,
         use_ai_scoring=True
@@ -167,37 +184,34 @@ def main():
     
     # Second case: product with score - will use existing score
     logger.info("CASE 2: Analyzing product with existing score")
-    product_with_score = SAMPLE_PRODUCT.copy()
-    product_with_score["score"] = {
-        "total": 83,
-        "category": "Excellent",
-        "nutrition_score": 51,
-        "additives_score": 32
-    }
-    
-    result2 = analyzer.analyze_product(
-        product_info=product_with_score,
+    case2 = dict(
+        product_info=PRODUCT_WITH_SCORE,
         user_allergens=USER_ALLERGENS,
         user_diets=USER_DIETS
     )
     
     # Third case: product with scoring algorithm only (no AI)
     logger.info("CASE 3: Analyzing product with algorithm-based scoring (no AI)")
-    product_for_algorithm = SAMPLE_PRODUCT.copy()
-    if "score" in product_for_algorithm:
-        del product_for_algorithm["score"]
     
     # Log detailed calculation steps before using the scoring engine
     logger.info("=== DETAILED SCORING CALCULATION ===")
-    log_detailed_score_calculation(product_for_algorithm)
+    log_detailed_score_calculation(PRODUCT_WITHOUT_SCORE)
     
-    result3 = analyzer.analyze_product(
-        product_info=product_for_algorithm,
+    case3 = dict(
+        product_info=PRODUCT_WITHOUT_SCORE,
         user_allergens=USER_ALLERGENS,
         user_diets=USER_DIETS,
         use_ai_scoring=False
     )
     
+    if analyzer.batch_mode:
+        # Offline run: submit all cases as one Batch API job and wait for it
+        logger.info("Submitting the cases to the Batch API; this may take a while")
+        result1, result2, result3 = analyzer.analyze_products([case1, case2, case3])
+    else:
+        # The three cases are independent, so their API requests run concurrently
+        result1, result2, result3 = asyncio.run(analyzer.aanalyze_products([case1, case2, case3]))
+    
     # Print results
     logger.info("=== CASE 1 RESULTS (AI-Generated Score with guided JSON) ===")
     print_analysis_results(result1)
@@ -213,12 +227,21 @@ def main():
 
 def log_detailed_score_calculation(product_data):
     """Log detailed steps of the scoring calculation process."""
-    # Create a copy of the data for scoring
-    scoring_data = product_data.copy()
+    # Everything below only feeds INFO records; skip the work, including
+    # formatting every message, when they would be filtered out
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
+    # Lines are collected and logged as one record at the end, instead of
+    # passing each through the logging handlers separately
+    lines = []
+    
+    # The product data is only read here, so no copy is needed
+    scoring_data = product_data
     
     # Log nutrition values and their scores
     nutrition = scoring_data.get("nutrition", {})
-    logger.info("Nutrition Component Scoring (60% of total):")
+    lines.append("Nutrition Component Scoring (60% of total):")
     
     # Protein scoring
     protein = nutrition.get("protein", 0)
@@ -231,7 +254,7 @@ def log_detailed_score_calculation(product_data):
         protein_rating = "medium"
     else:
         protein_rating = "low"
-    logger.info(f"  - Protein: {protein}g ({protein_rating}, score: {protein_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['proteins']}")
+    lines.append(f"  - Protein: {protein}g ({protein_rating}, score: {protein_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['proteins']}")
     
     # Fat scoring
     total_fat = nutrition.get("fat", {}).get("total", 0)
@@ -245,7 +268,7 @@ def log_detailed_score_calculation(product_data):
         fat_rating = "medium"
     else:
         fat_rating = "high"
-    logger.info(f"  - Fat: {total_fat}g total, {saturated_fat}g saturated ({fat_rating}, score: {fat_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['fats']}")
+    lines.append(f"  - Fat: {total_fat}g total, {saturated_fat}g saturated ({fat_rating}, score: {fat_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['fats']}")
     
     # Carbs/Sugar scoring
     total_carbs = nutrition.get("carbohydrates", {}).get("total", 0)
@@ -259,7 +282,7 @@ def log_detailed_score_calculation(product_data):
         sugar_rating = "medium"
     else:
         sugar_rating = "high"
-    logger.info(f"  - Carbs: {total_carbs}g total, {sugar}g sugar ({sugar_rating}, score: {carbs_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['carbs']}")
+    lines.append(f"  - Carbs: {total_carbs}g total, {sugar}g sugar ({sugar_rating}, score: {carbs_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['carbs']}")
     
     # Fiber scoring
     fiber = nutrition.get("fiber", 0)
@@ -272,7 +295,7 @@ def log_detailed_score_calculation(product_data):
         fiber_rating = "medium"
     else:
         fiber_rating = "low"
-    logger.info(f"  - Fiber: {fiber}g ({fiber_rating}, score: {fiber_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['fiber']}")
+    lines.append(f"  - Fiber: {fiber}g ({fiber_rating}, score: {fiber_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['fiber']}")
     
     # Salt scoring
     salt = nutrition.get("salt", 0)
@@ -285,7 +308,7 @@ def log_detailed_score_calculation(product_data):
         salt_rating = "medium"
     else:
         salt_rating = "high"
-    logger.info(f"  - Salt: {salt}g ({salt_rating}, score: {salt_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['salt']}")
+    lines.append(f"  - Salt: {salt}g ({salt_rating}, score: {salt_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['salt']}")
     
     # Calories scoring
     calories = nutrition.get("calories", 0)
@@ -298,7 +321,7 @@ def log_detailed_score_calculation(product_data):
         calories_rating = "medium"
     else:
         calories_rating = "high"
-    logger.info(f"  - Calories: {calories} kcal ({calories_rating}, score: {calories_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['calories']}")
+    lines.append(f"  - Calories: {calories} kcal ({calories_rating}, score: {calories_score}) - Weight: {ScoringEngine.NUTRITION_WEIGHTS['calories']}")
     
     # Calculate weighted nutrition score
     nutrition_weights = ScoringEngine.NUTRITION_WEIGHTS
@@ -311,25 +334,26 @@ def log_detailed_score_calculation(product_data):
         calories_score * nutrition_weights["calories"]
     )
     nutrition_score = weighted_nutrition_score * 10
-    logger.info(f"  = Nutrition Score: {nutrition_score:.1f}/100")
+    lines.append(f"  = Nutrition Score: {nutrition_score:.1f}/100")
     
     # Additives scoring (40% of total)
-    logger.info("Additives Component Scoring (40% of total):")
+    lines.append("Additives Component Scoring (40% of total):")
     
     # Extract additives from product data
     additives = scoring_data.get("additives", [])
     ingredients = scoring_data.get("ingredients", [])
     
-    # Get reference lists
-    safe_additives = set(scoring_data.get("safe_additives", []))
-    suspicious_additives = set(scoring_data.get("suspicious_additives", []))
-    harmful_additives = set(scoring_data.get("harmful_additives", []))
+    # Get reference lists, falling back to the configured ones; frozenset()
+    # returns the configured frozensets as they are instead of copying them
+    safe_additives = frozenset(scoring_data.get("safe_additives", SAFE_ADDITIVES))
+    suspicious_additives = frozenset(scoring_data.get("suspicious_additives", SUSPICIOUS_ADDITIVES))
+    harmful_additives = frozenset(scoring_data.get("harmful_additives", HARMFUL_ADDITIVES))
     
     # Log all additives being evaluated
-    logger.info(f"  - Additives found: {additives}")
-    logger.info(f"  - Safe additives reference: {', '.join(list(safe_additives)[:5])}...")
-    logger.info(f"  - Suspicious additives reference: {', '.join(list(suspicious_additives)[:5])}...")
-    logger.info(f"  - Harmful additives reference: {', '.join(list(harmful_additives)[:5])}...")
+    lines.append(f"  - Additives found: {additives}")
+    lines.append(f"  - Safe additives reference: {', '.join(islice(safe_additives, 5))}...")
+    lines.append(f"  - Suspicious additives reference: {', '.join(islice(suspicious_additives, 5))}...")
+    lines.append(f"  - Harmful additives reference: {', '.join(islice(harmful_additives, 5))}...")
     
     # Calculate additives scores
     all_additives = set(additives)
@@ -353,7 +377,7 @@ def log_detailed_score_calculation(product_data):
     else:
         safe_reason = "no safe additives present"
     
-    logger.info(f"  - Safe additives score: {safe_score} ({safe_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['safe']}")
+    lines.append(f"  - Safe additives score: {safe_score} ({safe_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['safe']}")
     
     # Score for suspicious additives
     suspicious_score = 0
@@ -366,7 +390,7 @@ def log_detailed_score_calculation(product_data):
     else:
         suspicious_reason = f"contains suspicious additives: {', '.join(suspicious_intersection)}"
     
-    logger.info(f"  - Suspicious additives score: {suspicious_score} ({suspicious_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['suspicious']}")
+    lines.append(f"  - Suspicious additives score: {suspicious_score} ({suspicious_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['suspicious']}")
     
     # Score for harmful additives
     harmful_score = 0
@@ -379,7 +403,7 @@ def log_detailed_score_calculation(product_data):
     else:
         harmful_reason = f"contains harmful additives: {', '.join(harmful_intersection)}"
     
-    logger.info(f"  - Harmful additives score: {harmful_score} ({harmful_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['harmful']}")
+    lines.append(f"  - Harmful additives score: {harmful_score} ({harmful_reason}) - Weight: {ScoringEngine.ADDITIVES_WEIGHTS['harmful']}")
     
     # Calculate weighted additives score
     additives_weights = ScoringEngine.ADDITIVES_WEIGHTS
@@ -389,7 +413,7 @@ def log_detailed_score_calculation(product_data):
         harmful_score * additives_weights["harmful"]
     )
     additives_score = weighted_additives_score * 10
-    logger.info(f"  = Additives Score: {additives_score:.1f}/100")
+    lines.append(f"  = Additives Score: {additives_score:.1f}/100")
     
     # Calculate final score
     overall_weights = ScoringEngine.OVERALL_WEIGHTS
@@ -401,35 +425,37 @@ def log_detailed_score_calculation(product_data):
     # Get category
     category = ScoringEngine.get_score_category(final_score)
     
-    logger.info("Final Score Calculation:")
-    logger.info(f"  - Nutrition ({overall_weights['nutrition'] * 100}%): {nutrition_score:.1f}")
-    logger.info(f"  - Additives ({overall_weights['additives'] * 100}%): {additives_score:.1f}")
-    logger.info(f"  = Total Score: {final_score}/100 (Category: {category})")
+    lines.append("Final Score Calculation:")
+    lines.append(f"  - Nutrition ({overall_weights['nutrition'] * 100}%): {nutrition_score:.1f}")
+    lines.append(f"  - Additives ({overall_weights['additives'] * 100}%): {additives_score:.1f}")
+    lines.append(f"  = Total Score: {final_score}/100 (Category: {category})")
+    
+    logger.info("\n".join(lines))
 
 
 def print_analysis_results(analysis):
     """Print analysis results in a readable format."""
     # Product score
-    logger.info(f"Product: {analysis.product.name}")
-    logger.info(f"Score: {analysis.product.score.total} ({analysis.product.score.category})")
-    logger.info(f"  - Nutrition score: {analysis.product.score.nutrition_score}")
-    logger.info(f"  - Additives score: {analysis.product.score.additives_score}")
+    logger.info("Product: %s", analysis.product.name)
+    logger.info("Score: %s (%s)", analysis.product.score.total, analysis.product.score.category)
+    logger.info("  - Nutrition score: %s", analysis.product.score.nutrition_score)
+    logger.info("  - Additives score: %s", analysis.product.score.additives_score)
     
     # Allergens
     logger.info("Detected allergens:")
     for allergen in analysis.allergens_analysis.detected_allergens:
-        logger.info(f"  - {allergen}")
+        logger.info("  - %s", allergen)
     
     logger.info("User allergens present:")
     for allergen in analysis.allergens_analysis.user_allergens_present:
-        logger.info(f"  - {allergen}")
+        logger.info("  - %s", allergen)
     
     # Diet compatibility
     logger.info("Diet compatibility:")
     for diet in analysis.diet_compatibility:
         status = "✓ Compatible" if diet.compatible else "✗ Not compatible"
-        logger.info(f"  - {diet.diet}: {status}")
-        logger.info(f"    Reason: {diet.reason}")
+        logger.info("  - %s: %s", diet.diet, status)
+        logger.info("    Reason: %s", diet.reason)
 
 
 if __name__ == "__main__":
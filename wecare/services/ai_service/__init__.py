@@ -1,5 +1,7 @@
 """AI service integration for WeCare application."""
 
 from wecare.services.ai_service.gpt_client import GPTClient
+from wecare.services.ai_service.batching_client import BatchingGPTClient
+from wecare.services.ai_service.response_cache import ResponseCache
 
-__all__ = ["GPTClient"] 
\ No newline at end of file
+__all__ = ["GPTClient", "BatchingGPTClient", "ResponseCache"] 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Batching GPT client for WeCare application.
+Coalesces concurrent product analyses into a single chat completion.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from wecare.core.models.schemas import AIServiceInput, AIServiceOutput
+from wecare.services.ai_service.gpt_client import BatchKey, GPTClient
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingGPTClient(GPTClient):
+    """GPT client that merges concurrent async analyses into batched requests.
+
+    Calls to ``aanalyze_product`` made within ``max_wait_ms`` of each other
+    with the same user preferences are sent as one chat completion of up to
+    ``max_batch`` products, which shares the static prompt across them.
+    Batches are split by the same size limits as ``analyze_products``.
+    """
+
+    def __init__(self, *args: Any, max_batch: Optional[int] = None, max_wait_ms: float = 20, **kwargs: Any):
+        """Initialize batching client.
+
+        Args:
+            *args: Positional arguments for GPTClient.
+            max_batch: Number of pending products that sends a batch at once,
+                at most (and by default) MAX_BATCH_PRODUCTS.
+            max_wait_ms: How long the first request of a batch waits for others.
+            **kwargs: Keyword arguments for GPTClient.
+        """
+        super().__init__(*args, **kwargs)
+        self.max_batch = min(max_batch or self.MAX_BATCH_PRODUCTS, self.MAX_BATCH_PRODUCTS)
+        self.max_wait = max_wait_ms / 1000
+        self._pending: Dict[BatchKey, List[Tuple[AIServiceInput, bytes, asyncio.Future]]] = {}
+        # Unresolved futures by response cache key, so identical concurrent
+        # requests wait on one analysis instead of each being sent
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+
+    async def aanalyze_product(self, input_data: AIServiceInput) -> AIServiceOutput:
+        """Analyze product, batching it with concurrent requests.
+
+        Args:
+            input_data: Product information and user preferences.
+
+        Returns:
+            Analysis including allergen info, diet compatibility, and optional score.
+        """
+        cache_key = self.response_cache.make_key(input_data, self.model)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(cache_key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[cache_key] = future
+            key = self._batch_key(input_data)
+            batch = self._pending.setdefault(key, [])
+            batch.append((input_data, cache_key, future))
+
+            if len(batch) >= self.max_batch:
+                self._flush(key)
+            elif key not in self._timers:
+                self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        # Shielded because the future may be shared: one caller being
+        # cancelled must not cancel the analysis for the others
+        output = await asyncio.shield(future)
+        # Callers get their own copy, as from the response cache
+        return output.copy()
+
+    def _flush(self, key: BatchKey) -> None:
+        """Send the pending batch for a key."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[AIServiceInput, bytes, asyncio.Future]]) -> None:
+        """Run the requests for one flushed batch and resolve its futures.
+
+        The batch is split by ``_split_batch``, so it follows the same prompt
+        size limits as ``analyze_products``.
+        """
+        futures = {cache_key: future for _, cache_key, future in batch}
+        chunks = self._split_batch([(cache_key, input_data) for input_data, cache_key, _ in batch])
+        await asyncio.gather(*(self._run_chunk(chunk, futures) for chunk in chunks))
+
+    async def _run_chunk(self, chunk: List[Tuple[bytes, AIServiceInput]], futures: Dict[bytes, asyncio.Future]) -> None:
+        """Run one batched request and resolve the futures waiting on it."""
+        inputs = [input_data for _, input_data in chunk]
+        try:
+            response = await self.async_client.chat.completions.create(**self._create_batch_request(inputs))
+            outputs = self._parse_batch_response(response, len(inputs))
+        except Exception as e:
+            logger.error("Error in batched GPT analysis: %s", e)
+            for cache_key, _ in chunk:
+                self._inflight.pop(cache_key, None)
+                future = futures[cache_key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (cache_key, _), output in zip(chunk, outputs):
+            self.response_cache.put(cache_key, output)
+            self._inflight.pop(cache_key, None)
+            future = futures[cache_key]
+            if not future.done():
+                future.set_result(output)
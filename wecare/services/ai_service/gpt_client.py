@@ -2,13 +2,19 @@
 GPT-4 client for WeCare application.
 Handles communication with OpenAI API for product analysis.
 """
+import atexit
+import copy
 import json
 import logging
 import os
-from typing import Dict, List, Any, Optional
+import re
+import threading
+import time
+from functools import cached_property
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 
 import openai
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultHttpxClient, OpenAI
 
 from wecare.config import settings
 from wecare.core.models.schemas import (
@@ -18,9 +24,133 @@ from wecare.core.models.schemas import (
     DietCompatibility,
     Score
 )
+from wecare.services.ai_service.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Process-wide clients handed out by GPTClient.get_shared, keyed by
+# (api_key, model, base_url, schema) so that callers reuse one client and
+# its response cache.
+_shared_clients: Dict[Tuple[str, Optional[str], Optional[str], Optional[str]], "GPTClient"] = {}
+_shared_clients_lock = threading.Lock()
+
+
+class _SharedHttpxClient(DefaultHttpxClient):
+    """HTTP client shared by the synchronous OpenAI clients of every GPTClient.
+    
+    Closing an OpenAI client closes its HTTP client, so ``close`` does nothing
+    here: one client being closed must not close the pool for the others. The
+    pool is closed once, at process exit.
+    """
+    
+    def close(self) -> None:
+        pass
+    
+    def close_pool(self) -> None:
+        """Close the pooled connections."""
+        super().close()
+
+
+# HTTP connection pool shared by the synchronous OpenAI clients of every
+# GPTClient, so new clients reuse open keep-alive connections. Async clients
+# keep their own pools, since connections are tied to one event loop.
+_http_client: Optional[_SharedHttpxClient] = None
+_http_client_lock = threading.Lock()
+
+
+def _shared_http_client() -> _SharedHttpxClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = _SharedHttpxClient()
+            atexit.register(_http_client.close_pool)
+        return _http_client
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Products are only analyzed in one prompt when they share these values, so
+# every product in a batch is analyzed against the same user preferences.
+BatchKey = Tuple[Tuple[str, ...], Tuple[str, ...], bool]
+
+
+def _encode_default(value: Any) -> Any:
+    """Serialize sets in product data as sorted lists."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Built once and reused for every prompt; json.dumps with options constructs
+# a new encoder on each call. Compact separators and unescaped non-ASCII text
+# keep the product data to as few input tokens as possible.
+_PRODUCT_ENCODER = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_encode_default
+)
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _ObjectFieldStream:
+    """Incrementally decodes the top-level fields of a streamed JSON object.
+    
+    Text is fed in arbitrary pieces; each call returns the ``(name, value)``
+    pairs whose values became complete, so callers can use a field as soon as
+    it has been received instead of waiting for the whole object.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self.done = False
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add streamed text and return the fields completed by it.
+        
+        Args:
+            text: Next piece of the JSON document.
+            
+        Returns:
+            Newly completed top-level fields, in document order.
+        """
+        self._buffer += text
+        buffer = self._buffer
+        fields = []
+        while not self.done:
+            pos = _WHITESPACE.match(buffer, self._pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if not self._started:
+                if char != "{":
+                    raise ValueError("Expected a JSON object in API response")
+                self._started = True
+                self._pos = pos + 1
+            elif char == ",":
+                self._pos = pos + 1
+            elif char == "}":
+                self._pos = pos + 1
+                self.done = True
+            else:
+                try:
+                    name, end = _JSON_DECODER.raw_decode(buffer, pos)
+                    end = _WHITESPACE.match(buffer, end).end()
+                    if end >= len(buffer):
+                        break
+                    if buffer[end] != ":":
+                        raise ValueError("Malformed JSON object in API response")
+                    value, end = _JSON_DECODER.raw_decode(buffer, _WHITESPACE.match(buffer, end + 1).end())
+                except json.JSONDecodeError:
+                    # The field is still incomplete; wait for more text
+                    break
+                # A number or literal at the very end may still be cut short
+                if end >= len(buffer) and not isinstance(value, (dict, list, str)):
+                    break
+                fields.append((name, value))
+                self._pos = end
+        return fields
+
 
 class GPTClient:
     """Client for interacting with OpenAI GPT models via LiteLLM proxy."""
@@ -46,7 +176,49 @@ class GPTClient:
         }
     }
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None, guided_json: Optional[Dict] = None):
+    # Request-independent part of the user prompt. It is emitted first and
+    # verbatim so that every prompt from a client shares one prefix, which the
+    # provider's prompt cache can reuse; request data is appended after it.
+    PROMPT_INSTRUCTIONS = """Analyze the food product information given at the end of this message and provide:
+
+1. Allergen analysis
+2. Diet compatibility assessment
+3. A product quality score (0-100), only if SCORE REQUESTED below is "yes"
+
+SCORING GUIDELINES (if needed):
+- Nutritional value (60% of total): Evaluate proteins, fats, carbs, fiber, salt, calories
+- Additives (40% of total): Evaluate E-codes and other additives
+- Final score should be 0-100 with categories: Excellent (81-100), Good (61-80), Average (41-60), Low Quality (21-40), Very Low Quality (0-20)
+
+Be comprehensive in allergen detection. Only include user allergens that are actually present in the product.
+
+Respond with a JSON object matching this exact schema. Leave out the "score" key if SCORE REQUESTED is "no":
+```
+{schema}
+```
+
+Strictly adhere to this schema to ensure consistent responses.
+"""
+    
+    # Appended to the instructions when several products share one prompt
+    BATCH_NOTE = (
+        "\nPRODUCT INFORMATION below is a JSON list of products. Return one entry in "
+        "\"results\" per product, in the same order as the list.\n"
+    )
+    
+    # Most product data sent in one batched prompt, about 6000 tokens at the
+    # usual four characters per token
+    MAX_BATCH_CHARS = 24_000
+    
+    # Most products in one batched prompt; the response grows with every
+    # product and must stay within the model's output token limit. Both caps
+    # are applied by _split_batch for every batched path.
+    MAX_BATCH_PRODUCTS = 10
+    
+    # Longest wait between status checks of a Batch API job, in seconds
+    MAX_BATCH_POLL_INTERVAL = 300.0
+    
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None, guided_json: Optional[Dict] = None, response_cache: Optional[ResponseCache] = None):
         """Initialize GPT client with API key and model.
         
         Args:
@@ -54,6 +226,8 @@ class GPTClient:
             model: GPT model to use, defaults to OPENAI_MODEL from settings.
             base_url: Base URL for the LiteLLM proxy server, defaults to LLM_API_BASE_URL from settings.
             guided_json: Optional JSON schema template to guide the model's responses. If None, uses DEFAULT_RESPONSE_SCHEMA.
+            response_cache: Optional cache of previous responses. If None, a cache of RESPONSE_CACHE_SIZE entries
+                expiring after RESPONSE_CACHE_TTL seconds is created, backed by RESPONSE_CACHE_PATH if set.
         """
         self.api_key = api_key or settings.OPENAI_API_KEY
         if not self.api_key:
@@ -61,12 +235,61 @@ class GPTClient:
         
         self.model = model or settings.OPENAI_MODEL
         self.base_url = base_url or settings.LLM_API_BASE_URL
-        self.guided_json = guided_json or self.DEFAULT_RESPONSE_SCHEMA
+        # Copied so later changes to the caller's template cannot drift from
+        # the schema text serialized below
+        self.guided_json = copy.deepcopy(guided_json or self.DEFAULT_RESPONSE_SCHEMA)
+        self._guided_json_str = json.dumps(self.guided_json, sort_keys=True, separators=(",", ":"))
+        self._prompt_prefix = self.PROMPT_INSTRUCTIONS.format(schema=self._guided_json_str)
+        self._batch_prompt_prefix = self.PROMPT_INSTRUCTIONS.format(
+            schema=f'{{"results":[{self._guided_json_str}]}}'
+        ) + self.BATCH_NOTE
+        self.response_cache = response_cache if response_cache is not None else ResponseCache(
+            settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_PATH or None
+        )
         
+        # The SDK retries 429, 5xx and connection errors itself, with jittered
+        # exponential backoff that honors Retry-After
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=_shared_http_client()
         )
+    
+    @cached_property
+    def async_client(self) -> AsyncOpenAI:
+        """Async OpenAI client, created on first async use so sync-only clients do not hold one."""
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=settings.OPENAI_MAX_RETRIES
+        )
+    
+    @classmethod
+    def get_shared(cls, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None, guided_json: Optional[Dict] = None) -> "GPTClient":
+        """Return a process-wide client for the given credentials and schema.
+        
+        Repeated calls with the same arguments return the same instance, so the
+        underlying HTTP connection pools and response cache are shared instead
+        of rebuilt.
+        
+        Args:
+            api_key: API key for the proxy.
+            model: GPT model to use.
+            base_url: Base URL for the LiteLLM proxy server.
+            guided_json: Optional JSON schema template to guide the model's responses.
+            
+        Returns:
+            Shared GPTClient instance.
+        """
+        schema = json.dumps(guided_json, sort_keys=True) if guided_json else None
+        key = (api_key or settings.OPENAI_API_KEY, model, base_url, schema)
+        with _shared_clients_lock:
+            client = _shared_clients.get(key)
+            if client is None:
+                client = cls(api_key=api_key, model=model, base_url=base_url, guided_json=guided_json)
+                _shared_clients[key] = client
+            return client
         
     def _create_prompt(self, input_data: AIServiceInput) -> str:
         """Create a prompt for GPT based on product info and user preferences.
@@ -77,46 +300,224 @@ class GPTClient:
         Returns:
             Formatted prompt string for GPT.
         """
-        product_info = json.dumps(input_data.product_info, indent=2)
-        user_allergens = ", ".join(input_data.user_allergens) if input_data.user_allergens else "None"
-        user_diets = ", ".join(input_data.user_diets) if input_data.user_diets else "None"
+        # Sorted so that equivalent requests produce byte-identical prompts
+        product_info = _PRODUCT_ENCODER.encode(input_data.product_info)
+        user_allergens = ", ".join(sorted(input_data.user_allergens)) if input_data.user_allergens else "None"
+        user_diets = ", ".join(sorted(input_data.user_diets)) if input_data.user_diets else "None"
+        score_requested = (
+            "yes - Calculate a product quality score (0-100)"
+            if input_data.calculate_score else "no"
+        )
         
-        # Generate response schema based on whether score is needed
-        response_schema = self.guided_json.copy()
-        if not input_data.calculate_score and "score" in response_schema:
-            response_schema.pop("score")
+        # Static instructions and schema first, request-specific data last
+        prompt = f"""{self._prompt_prefix}
+SCORE REQUESTED: {score_requested}
+
+PRODUCT INFORMATION:
+{product_info}
+
+USER ALLERGENS: {user_allergens}
+
+USER DIETARY PREFERENCES: {user_diets}
+"""
+        return prompt
+    
+    def _create_request(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for a prompt.
         
-        schema_str = json.dumps(response_schema, indent=2)
+        Args:
+            prompt: User prompt created by ``_create_prompt``.
+            
+        Returns:
+            Keyword arguments for ``chat.completions.create``.
+        """
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are a precise nutrition analysis assistant that replies only with JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {"type": "json_object"},
+            # Analyses are cached and batched, so the same input should get
+            # the same answer
+            "temperature": 0
+        }
+    
+    @staticmethod
+    def _parse_response(response: Any) -> AIServiceOutput:
+        """Convert a chat completion response into an AIServiceOutput.
         
-        prompt = f"""
-        Analyze the following food product information and provide:
+        Args:
+            response: Response returned by ``chat.completions.create``.
+            
+        Returns:
+            Analysis including allergen info, diet compatibility, and optional score.
+        """
+        content = response.choices[0].message.content
+        if content is None:
+            raise ValueError("Empty response received from API")
+        return AIServiceOutput.from_json(content)
+    
+    @staticmethod
+    def _batch_key(input_data: AIServiceInput) -> BatchKey:
+        """Return the key of the batch an input can join."""
+        return (
+            tuple(sorted(input_data.user_allergens)),
+            tuple(sorted(input_data.user_diets)),
+            input_data.calculate_score
+        )
+    
+    def _create_batch_prompt(self, inputs: List[AIServiceInput]) -> str:
+        """Create a prompt analyzing several products with the same preferences.
         
-        1. Allergen analysis 
-        2. Diet compatibility assessment
-        {f"3. Calculate a product quality score (0-100)" if input_data.calculate_score else ""}
+        Args:
+            inputs: Inputs sharing one batch key.
+            
+        Returns:
+            Formatted prompt string for GPT.
+        """
+        first = inputs[0]
+        products = _PRODUCT_ENCODER.encode([item.product_info for item in inputs])
+        user_allergens = ", ".join(sorted(first.user_allergens)) if first.user_allergens else "None"
+        user_diets = ", ".join(sorted(first.user_diets)) if first.user_diets else "None"
+        score_requested = (
+            "yes - Calculate a product quality score (0-100)"
+            if first.calculate_score else "no"
+        )
         
-        PRODUCT INFORMATION:
-        {product_info}
+        return f"""{self._batch_prompt_prefix}
+SCORE REQUESTED: {score_requested}
+
+PRODUCT INFORMATION:
+{products}
+
+USER ALLERGENS: {user_allergens}
+
+USER DIETARY PREFERENCES: {user_diets}
+"""
+    
+    def _create_batch_request(self, inputs: List[AIServiceInput]) -> Dict[str, Any]:
+        """Build the chat completion arguments for a batch of inputs.
         
-        USER ALLERGENS: {user_allergens}
+        A batch of one uses the regular single-product prompt.
         
-        USER DIETARY PREFERENCES: {user_diets}
+        Args:
+            inputs: Inputs sharing one batch key.
+            
+        Returns:
+            Keyword arguments for ``chat.completions.create``.
+        """
+        if len(inputs) == 1:
+            return self._create_request(self._create_prompt(inputs[0]))
+        return self._create_request(self._create_batch_prompt(inputs))
+    
+    @classmethod
+    def _parse_batch_response(cls, response: Any, count: int) -> List[AIServiceOutput]:
+        """Split a batched chat completion response into per-product outputs.
         
-        SCORING GUIDELINES (if needed):
-        - Nutritional value (60% of total): Evaluate proteins, fats, carbs, fiber, salt, calories
-        - Additives (40% of total): Evaluate E-codes and other additives
-        - Final score should be 0-100 with categories: Excellent (81-100), Good (61-80), Average (41-60), Low Quality (21-40), Very Low Quality (0-20)
+        Args:
+            response: Response to a request built by ``_create_batch_request``.
+            count: Number of products in the batch.
+            
+        Returns:
+            One analysis per product, in request order.
+        """
+        if count == 1:
+            return [cls._parse_response(response)]
+        content = response.choices[0].message.content
+        if content is None:
+            raise ValueError("Empty response received from API")
+        results = json.loads(content)["results"]
+        if len(results) != count:
+            raise ValueError(f"Expected {count} results in batched response, got {len(results)}")
+        return [AIServiceOutput.from_dict(result) for result in results]
+    
+    def _split_batch(self, items: List[Tuple[bytes, AIServiceInput]]) -> List[List[Tuple[bytes, AIServiceInput]]]:
+        """Split inputs sharing one batch key into prompts of bounded size.
         
-        Be comprehensive in allergen detection. Only include user allergens that are actually present in the product.
+        Args:
+            items: ``(cache_key, input)`` pairs sharing one batch key.
+            
+        Returns:
+            Consecutive chunks of at most MAX_BATCH_PRODUCTS products whose
+            data fits in MAX_BATCH_CHARS; a product larger than that is sent
+            on its own.
+        """
+        chunks = []
+        chunk: List[Tuple[bytes, AIServiceInput]] = []
+        size = 0
+        for item in items:
+            item_size = len(_PRODUCT_ENCODER.encode(item[1].product_info))
+            if chunk and (size + item_size > self.MAX_BATCH_CHARS or len(chunk) >= self.MAX_BATCH_PRODUCTS):
+                chunks.append(chunk)
+                chunk = []
+                size = 0
+            chunk.append(item)
+            size += item_size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+    
+    @staticmethod
+    def _create_field(name: str, value: Any) -> Any:
+        """Convert one decoded top-level response field into its model.
         
-        Respond with a JSON object matching this exact schema:
-        ```
-        {schema_str}
-        ```
+        Args:
+            name: Field name in the response schema.
+            value: Decoded JSON value of the field.
+            
+        Returns:
+            AllergenAnalysis, list of DietCompatibility or Score, or None for unknown fields.
+        """
+        if name == "allergens_analysis":
+            return AllergenAnalysis.from_dict(value)
+        if name == "diet_compatibility":
+            return [DietCompatibility.from_dict(item) for item in value]
+        if name == "score":
+            return Score.from_dict(value)
+        return None
+    
+    def _lookup_cached(
+        self, inputs: List[AIServiceInput]
+    ) -> Tuple[List[Optional[AIServiceOutput]], Dict[bytes, Tuple[AIServiceInput, List[int]]]]:
+        """Answer inputs from the response cache.
         
-        Strictly adhere to this schema to ensure consistent responses.
+        Args:
+            inputs: Product information and user preferences, one per product.
+            
+        Returns:
+            Outputs in input order, None where not cached, and the uncached
+            inputs by cache key with the positions asking for them.
         """
-        return prompt
+        outputs: List[Optional[AIServiceOutput]] = [None] * len(inputs)
+        pending: Dict[bytes, Tuple[AIServiceInput, List[int]]] = {}
+        for index, input_data in enumerate(inputs):
+            cache_key = self.response_cache.make_key(input_data, self.model)
+            if cache_key in pending:
+                pending[cache_key][1].append(index)
+                continue
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                outputs[index] = cached
+            else:
+                pending[cache_key] = (input_data, [index])
+        return outputs, pending
+    
+    def _store_output(self, outputs: List[Optional[AIServiceOutput]], positions: List[int],
+                      cache_key: bytes, output: AIServiceOutput) -> None:
+        """Cache a received output and place it at every position asking for it."""
+        self.response_cache.put(cache_key, output)
+        self._place_output(outputs, positions, output)
+    
+    @staticmethod
+    def _place_output(outputs: List[Optional[AIServiceOutput]], positions: List[int],
+                      output: AIServiceOutput) -> None:
+        """Place an output at every position asking for it."""
+        first, *repeats = positions
+        outputs[first] = output
+        # Repeated inputs get their own copies, as cache hits do
+        for index in repeats:
+            outputs[index] = output.copy()
     
     def analyze_product(self, input_data: AIServiceInput) -> AIServiceOutput:
         """Analyze product using GPT-4.
@@ -127,54 +528,257 @@ class GPTClient:
         Returns:
             Analysis including allergen info, diet compatibility, and optional score.
         """
-        prompt = self._create_prompt(input_data)
+        return self.analyze_products([input_data])[0]
+    
+    def analyze_products(self, inputs: List[AIServiceInput]) -> List[AIServiceOutput]:
+        """Analyze several products using as few GPT requests as possible.
+        
+        Products with the same user preferences are sent together in one
+        prompt, so the instructions and schema are sent once per batch rather
+        than once per product. Cached and repeated inputs are not sent again.
+        
+        Args:
+            inputs: Product information and user preferences, one per product.
+            
+        Returns:
+            One analysis per input, in input order.
+        """
+        outputs, pending = self._lookup_cached(inputs)
+        
+        batches: Dict[BatchKey, List[Tuple[bytes, AIServiceInput]]] = {}
+        for cache_key, (input_data, _) in pending.items():
+            batches.setdefault(self._batch_key(input_data), []).append((cache_key, input_data))
+        
+        for batch in batches.values():
+            for chunk in self._split_batch(batch):
+                chunk_inputs = [input_data for _, input_data in chunk]
+                try:
+                    response = self.client.chat.completions.create(**self._create_batch_request(chunk_inputs))
+                    results = self._parse_batch_response(response, len(chunk_inputs))
+                except Exception as e:
+                    logger.error("Error in GPT analysis: %s", e)
+                    raise
+                
+                for (cache_key, _), output in zip(chunk, results):
+                    self._store_output(outputs, pending[cache_key][1], cache_key, output)
+        
+        return outputs
+    
+    def start_batch(self, inputs: List[AIServiceInput]) -> Optional[str]:
+        """Submit the uncached inputs as a Batch API job without waiting for it.
+        
+        Batch requests are billed at about half the price of regular ones but
+        may take up to 24 hours, so this suits offline analyses only. Collect
+        the results later with ``fetch_batch_results``.
+        
+        Args:
+            inputs: Product information and user preferences, one per product.
+            
+        Returns:
+            ID of the submitted batch, or None if every input is already cached.
+        """
+        _, pending = self._lookup_cached(inputs)
+        if not pending:
+            return None
+        return self._start_batch(pending)
+    
+    def _start_batch(self, pending: Dict[bytes, Tuple[AIServiceInput, List[int]]]) -> str:
+        """Upload the pending inputs and create a Batch API job for them."""
+        # Requests are identified by their cache key, so results can be
+        # matched to inputs without keeping any state between the calls
+        lines = [
+            json.dumps({
+                "custom_id": cache_key.hex(),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._create_request(self._create_prompt(input_data))
+            })
+            for cache_key, (input_data, _) in pending.items()
+        ]
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a precise nutrition analysis assistant that replies only with JSON."},
-                    {"role": "user", "content": prompt}     
-                ],
-                response_format={"type": "json_object"}
+            batch_file = self.client.files.create(
+                file=("requests.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
             )
+        except Exception as e:
+            logger.error("Error in GPT batch analysis: %s", e)
+            raise
+        return batch.id
+    
+    def fetch_batch_results(self, batch_id: str) -> Dict[bytes, AIServiceOutput]:
+        """Download the results of a completed Batch API job into the response cache.
+        
+        Once fetched, the analyses are answered from the cache by every
+        analyze method, as long as they stay cached.
+        
+        Args:
+            batch_id: ID returned by ``start_batch``.
             
-            # Extract and parse response
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("Empty response received from API")
-            result = json.loads(content)
+        Returns:
+            Analyses by response cache key.
             
-            # Create output object
-            allergens_analysis: AllergenAnalysis = AllergenAnalysis(
-                detected_allergens=result["allergens_analysis"]["detected_allergens"],
-                user_allergens_present=result["allergens_analysis"]["user_allergens_present"]
-            )
+        Raises:
+            RuntimeError: If the batch has not completed.
+        """
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch_id} has status {batch.status}, not completed")
+            results = self.client.files.content(batch.output_file_id).text
             
-            diet_compatibility = [
-                DietCompatibility(
-                    diet=item["diet"],
-                    compatible=item["compatible"],
-                    reason=item["reason"]
-                )
-                for item in result["diet_compatibility"]
-            ]
-            
-            score = None
-            if "score" in result:
-                score = Score(
-                    total=result["score"]["total"],
-                    category=result["score"]["category"],
-                    nutrition_score=result["score"]["nutrition_score"],
-                    additives_score=result["score"]["additives_score"]
-                )
-            
-            return AIServiceOutput(
-                allergens_analysis=allergens_analysis,
-                diet_compatibility=diet_compatibility,
-                score=score
-            )
+            outputs = {}
+            for line in results.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response")
+                if record.get("error") or not response or response.get("status_code") != 200:
+                    raise ValueError(f"Batch request {record.get('custom_id')} failed: {record.get('error')}")
+                content = response["body"]["choices"][0]["message"]["content"]
+                if content is None:
+                    raise ValueError("Empty response received from API")
+                output = AIServiceOutput.from_json(content)
+                cache_key = bytes.fromhex(record["custom_id"])
+                self.response_cache.put(cache_key, output)
+                outputs[cache_key] = output
+        except Exception as e:
+            logger.error("Error in GPT batch analysis: %s", e)
+            raise
+        return outputs
+    
+    def submit_batch(self, inputs: List[AIServiceInput], poll_interval: float = 30.0,
+                     timeout: float = 24 * 3600) -> List[AIServiceOutput]:
+        """Analyze products through the Batch API and wait for the results.
+        
+        Args:
+            inputs: Product information and user preferences, one per product.
+            poll_interval: Seconds before the first status check; doubles after
+                each check, up to MAX_BATCH_POLL_INTERVAL.
+            timeout: Seconds to wait for the batch before giving up.
+            
+        Returns:
+            One analysis per input, in input order.
+            
+        Raises:
+            RuntimeError: If the batch fails, expires or is cancelled.
+            TimeoutError: If the batch does not complete within ``timeout``.
+        """
+        outputs, pending = self._lookup_cached(inputs)
+        if not pending:
+            return outputs
+        
+        batch_id = self._start_batch(pending)
+        try:
+            self._wait_for_batch(batch_id, poll_interval, timeout)
+        except Exception as e:
+            logger.error("Error in GPT batch analysis: %s", e)
+            raise
+        results = self.fetch_batch_results(batch_id)
+        
+        missing = len(pending) - len(results.keys() & pending.keys())
+        if missing:
+            raise ValueError(f"Missing {missing} of {len(pending)} results in batch output")
+        for cache_key, (_, positions) in pending.items():
+            self._place_output(outputs, positions, results[cache_key])
+        return outputs
+    
+    def _wait_for_batch(self, batch_id: str, poll_interval: float, timeout: float) -> Any:
+        """Poll a Batch API job until it completes.
+        
+        Returns:
+            The completed batch.
+        """
+        deadline = time.monotonic() + timeout
+        delay = poll_interval
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                return batch
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Batch {batch_id} did not complete within {timeout} seconds")
+            time.sleep(delay)
+            delay = min(delay * 2, self.MAX_BATCH_POLL_INTERVAL)
+    
+    async def aanalyze_product(self, input_data: AIServiceInput) -> AIServiceOutput:
+        """Analyze product using GPT-4 without blocking the event loop.
+        
+        Several products can be analyzed concurrently, e.g. with
+        ``asyncio.gather``, over the shared async connection pool.
+        
+        Args:
+            input_data: Product information and user preferences.
+            
+        Returns:
+            Analysis including allergen info, diet compatibility, and optional score.
+        """
+        cache_key = self.response_cache.make_key(input_data, self.model)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.async_client.chat.completions.create(**self._create_request(self._create_prompt(input_data)))
+            output = self._parse_response(response)
+        except Exception as e:
+            logger.error("Error in GPT analysis: %s", e)
+            raise
+        
+        self.response_cache.put(cache_key, output)
+        return output
+    
+    async def stream_analyze_product(self, input_data: AIServiceInput) -> AsyncIterator[Tuple[str, Any]]:
+        """Analyze product, yielding each part of the analysis as it arrives.
+        
+        The response is streamed and decoded incrementally, so the allergen
+        analysis can be used before the diet assessment and score are complete.
+        
+        Args:
+            input_data: Product information and user preferences.
             
+        Yields:
+            ``(field_name, value)`` pairs: ``allergens_analysis`` with an
+            AllergenAnalysis, ``diet_compatibility`` with a list of
+            DietCompatibility and, if returned, ``score`` with a Score.
+        """
+        cache_key = self.response_cache.make_key(input_data, self.model)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            yield "allergens_analysis", cached.allergens_analysis
+            yield "diet_compatibility", cached.diet_compatibility
+            if cached.score is not None:
+                yield "score", cached.score
+            return
+        
+        fields: Dict[str, Any] = {}
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._create_request(self._create_prompt(input_data)),
+                stream=True
+            )
+            parser = _ObjectFieldStream()
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                for name, value in parser.feed(chunk.choices[0].delta.content):
+                    field = self._create_field(name, value)
+                    if field is not None:
+                        fields[name] = field
+                        yield name, field
         except Exception as e:
-            logger.error(f"Error in GPT analysis: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error("Error in GPT analysis: %s", e)
+            raise
+        
+        if "allergens_analysis" in fields and "diet_compatibility" in fields:
+            self.response_cache.put(cache_key, AIServiceOutput(
+                allergens_analysis=fields["allergens_analysis"],
+                diet_compatibility=fields["diet_compatibility"],
+                score=fields.get("score")
+            ))
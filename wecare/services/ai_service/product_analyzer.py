@@ -2,28 +2,80 @@
 High-level product analysis service using GPT-4.
 Integrates GPT client with product analysis logic.
 """
+import asyncio
 import json
-from typing import Dict, List, Any, Optional
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 
+from wecare.config import settings
 from wecare.core.models.schemas import (
     AIServiceInput, 
     AIServiceOutput,
+    AllergenAnalysis,
+    CarbInfo,
+    DietCompatibility,
+    FatInfo,
+    Ingredient,
+    NutritionInfo,
     ProductInfo,
     ProductAnalysis,
-    Score
+    Score,
+    Weight
 )
-from wecare.core.scoring.scoring_engine import ScoringEngine
+from wecare.core.scoring.scoring_engine import ReferenceAdditives, ScoringEngine
 from wecare.services.ai_service.gpt_client import GPTClient
 from wecare.utils.logger import get_logger
 
 
 logger = get_logger(__name__)
 
+# Numeric value and unit at the start of an Open Food Facts quantity string
+_WEIGHT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]+)")
+
+
+_FALLBACK_REASON = "Unable to determine compatibility due to analysis error"
+
+
+@lru_cache(maxsize=512)
+def _fallback_for(diets: Tuple[str, ...]) -> Tuple[DietCompatibility, ...]:
+    """Return the fallback verdicts for a set of diets.
+    
+    DietCompatibility is frozen, so the same instances are shared between
+    fallback analyses for the same diets.
+    """
+    return tuple(
+        DietCompatibility(diet=diet, compatible=False, reason=_FALLBACK_REASON)
+        for diet in diets
+    )
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _external_score(total: int, category: str, nutrition_score: int, additives_score: int) -> Score:
+    """Return the Score for an external service's score values.
+    
+    Score is frozen, so products with the same external score share one instance.
+    """
+    return Score(
+        total=total,
+        category=category,
+        nutrition_score=nutrition_score,
+        additives_score=additives_score
+    )
+
+
+def _per_100g(nutriments: Dict[str, Any], name: str) -> Any:
+    """Return a nutriment's per-100g value, falling back to its plain key."""
+    key = name + "_100g"
+    if key in nutriments:
+        return nutriments[key]
+    return nutriments.get(name, 0)
+
 
 class ProductAnalyzer:
     """Service for analyzing food products using AI."""
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, guided_json: Optional[Dict[str, Any]] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, guided_json: Optional[Dict[str, Any]] = None, batch_mode: bool = False, reference_additives: Optional[ReferenceAdditives] = None):
         """Initialize product analyzer.
         
         Args:
@@ -31,8 +83,22 @@ class ProductAnalyzer:
             model: GPT model to use
             guided_json: Optional JSON schema template to guide the model's responses.
                         If None, uses GPTClient's default schema.
+            batch_mode: Whether analyze_products uses the Batch API, which is
+                        cheaper but may take hours; for offline runs only.
+            reference_additives: Additive reference sets for local scoring of
+                        products that do not carry their own lists, built with
+                        ScoringEngine.reference_lists.
         """
-        self.gpt_client = GPTClient(api_key=api_key, model=model, guided_json=guided_json)
+        # Shared so that analyzers created per request keep warm connections
+        # and cached responses
+        self.gpt_client = GPTClient.get_shared(api_key=api_key, model=model, guided_json=guided_json)
+        self.batch_mode = batch_mode
+        self.reference_additives = reference_additives
+    
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit and miss counts and size of the AI response cache, for metrics."""
+        return self.gpt_client.response_cache.stats()
     
     def analyze_product(
         self, 
@@ -52,42 +118,200 @@ class ProductAnalyzer:
         Returns:
             Complete product analysis with AI-generated insights
         """
-        logger.info(f"Analyzing product: {product_info.get('name', 'Unknown')}")
+        ai_input = self._create_ai_input(product_info, user_allergens, user_diets, use_ai_scoring)
+        
+        # Get AI analysis
+        if ai_input is None:
+            ai_output = self._create_empty_analysis()
+        else:
+            try:
+                ai_output = self.gpt_client.analyze_product(ai_input)
+                logger.debug("GPT analysis completed successfully")
+            except Exception as e:
+                logger.error("Error during GPT analysis: %s", e)
+                # Provide fallback values if GPT fails
+                ai_output = self._create_fallback_analysis(
+                    user_allergens=user_allergens,
+                    user_diets=user_diets
+                )
+        
+        return self._create_analysis(product_info, ai_output, use_ai_scoring)
+    
+    async def aanalyze_product(
+        self, 
+        product_info: Dict[str, Any],
+        user_allergens: List[str],
+        user_diets: List[str],
+        use_ai_scoring: bool = True
+    ) -> ProductAnalysis:
+        """Analyze product like ``analyze_product`` without blocking the event loop.
+        
+        Several products can be analyzed concurrently with ``asyncio.gather``,
+        so their GPT requests overlap instead of running one after another.
+        
+        Args:
+            product_info: Product information from external service
+            user_allergens: List of user's allergens
+            user_diets: List of user's dietary preferences
+            use_ai_scoring: Whether to use AI for scoring (if False, uses local scoring engine)
+            
+        Returns:
+            Complete product analysis with AI-generated insights
+        """
+        ai_input = self._create_ai_input(product_info, user_allergens, user_diets, use_ai_scoring)
+        
+        # Get AI analysis
+        if ai_input is None:
+            ai_output = self._create_empty_analysis()
+        else:
+            try:
+                ai_output = await self.gpt_client.aanalyze_product(ai_input)
+                logger.debug("GPT analysis completed successfully")
+            except Exception as e:
+                logger.error("Error during GPT analysis: %s", e)
+                # Provide fallback values if GPT fails
+                ai_output = self._create_fallback_analysis(
+                    user_allergens=user_allergens,
+                    user_diets=user_diets
+                )
+        
+        return self._create_analysis(product_info, ai_output, use_ai_scoring)
+    
+    def analyze_products(self, requests: List[Dict[str, Any]]) -> List[ProductAnalysis]:
+        """Analyze several products with as few GPT requests as possible.
+        
+        Args:
+            requests: Keyword arguments of ``analyze_product``, one dict per product
+            
+        Returns:
+            Complete product analyses, in request order
+        """
+        requests = [{"use_ai_scoring": True, **request} for request in requests]
+        ai_inputs = [self._create_ai_input(**request) for request in requests]
+        
+        # Get AI analyses for the products that need one
+        to_send = [ai_input for ai_input in ai_inputs if ai_input is not None]
+        received: List[Optional[AIServiceOutput]] = [None] * len(to_send)
+        if to_send:
+            try:
+                if self.batch_mode:
+                    received = self.gpt_client.submit_batch(to_send)
+                else:
+                    received = self.gpt_client.analyze_products(to_send)
+                logger.debug("GPT analysis completed successfully")
+            except Exception as e:
+                logger.error("Error during GPT analysis: %s", e)
+        
+        analyses = []
+        received_outputs = iter(received)
+        for request, ai_input in zip(requests, ai_inputs):
+            if ai_input is None:
+                ai_output = self._create_empty_analysis()
+            else:
+                ai_output = next(received_outputs)
+                if ai_output is None:
+                    # Provide fallback values if GPT fails
+                    ai_output = self._create_fallback_analysis(
+                        user_allergens=request["user_allergens"],
+                        user_diets=request["user_diets"]
+                    )
+            analyses.append(self._create_analysis(request["product_info"], ai_output, request["use_ai_scoring"]))
+        return analyses
+    
+    async def aanalyze_products(
+        self,
+        requests: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None
+    ) -> List[ProductAnalysis]:
+        """Analyze several products concurrently without blocking the event loop.
+        
+        Args:
+            requests: Keyword arguments of ``analyze_product``, one dict per product
+            max_concurrency: Most analyses in flight at a time, defaults to
+                OPENAI_CONCURRENCY from settings
+            
+        Returns:
+            Complete product analyses, in request order
+        """
+        # Created per call so it belongs to the running event loop
+        semaphore = asyncio.Semaphore(max_concurrency or settings.OPENAI_CONCURRENCY)
+        
+        async def analyze(request: Dict[str, Any]) -> ProductAnalysis:
+            async with semaphore:
+                return await self.aanalyze_product(**request)
+        
+        return list(await asyncio.gather(*(analyze(request) for request in requests)))
+    
+    @staticmethod
+    def _create_ai_input(
+        product_info: Dict[str, Any],
+        user_allergens: List[str],
+        user_diets: List[str],
+        use_ai_scoring: bool
+    ) -> Optional[AIServiceInput]:
+        """Create the GPT input for a product analysis.
+        
+        Returns:
+            Input for the GPT client, or None if there is nothing to ask GPT for
+        """
+        # Formatted only if the record is emitted; this runs for every product
+        logger.info("Analyzing product: %s", product_info.get("name", "Unknown"))
         
         # Determine if we need GPT to calculate the score
         external_score_available = "score" in product_info and product_info.get("score") is not None
         calculate_score = not external_score_available and use_ai_scoring
         
+        if external_score_available and not user_allergens and not user_diets:
+            # Nothing to ask GPT for: the score comes from the external service
+            # and there are no user allergens or diets to check. Without an
+            # external score GPT is still asked, so detected allergens are kept
+            logger.debug("Skipping GPT analysis, no AI output requested")
+            return None
+        
         # Create input for GPT
-        ai_input = AIServiceInput(
+        return AIServiceInput(
             product_info=product_info,
             user_allergens=user_allergens,
             user_diets=user_diets,
             calculate_score=calculate_score
         )
+    
+    @staticmethod
+    def _create_empty_analysis() -> AIServiceOutput:
+        """Create the AI output used when GPT is not asked for anything."""
+        return AIServiceOutput(
+            allergens_analysis=AllergenAnalysis(detected_allergens=[], user_allergens_present=[]),
+            diet_compatibility=[],
+            score=None
+        )
+    
+    def _create_analysis(
+        self,
+        product_info: Dict[str, Any],
+        ai_output: AIServiceOutput,
+        use_ai_scoring: bool
+    ) -> ProductAnalysis:
+        """Combine the AI output with the product score into a product analysis.
         
-        # Get AI analysis
-        try:
-            ai_output = self.gpt_client.analyze_product(ai_input)
-            logger.debug("GPT analysis completed successfully")
-        except Exception as e:
-            logger.error(f"Error during GPT analysis: {str(e)}")
-            # Provide fallback values if GPT fails
-            ai_output = self._create_fallback_analysis(
-                user_allergens=user_allergens,
-                user_diets=user_diets
-            )
-        
+        Args:
+            product_info: Product information from external service
+            ai_output: AI analysis, or the fallback analysis
+            use_ai_scoring: Whether to use AI for scoring
+            
+        Returns:
+            Complete product analysis
+        """
         # Determine which scoring method to use
+        external_score_available = "score" in product_info and product_info.get("score") is not None
         if external_score_available:
             # Use score from product info
             logger.debug("Using score from external service")
             score_data = product_info.get("score", {})
-            product_score = Score(
-                total=score_data.get("total", 50),
-                category=score_data.get("category", "Average"),
-                nutrition_score=score_data.get("nutrition_score", 30),
-                additives_score=score_data.get("additives_score", 20)
+            product_score = _external_score(
+                score_data.get("total", 50),
+                score_data.get("category", "Average"),
+                score_data.get("nutrition_score", 30),
+                score_data.get("additives_score", 20)
             )
         elif use_ai_scoring and ai_output.score:
             # Use AI-generated score if requested and available
@@ -96,7 +320,7 @@ class ProductAnalyzer:
         else:
             # Use local scoring engine
             logger.debug("Calculating score with scoring engine")
-            product_score = ScoringEngine.calculate_score(product_info)
+            product_score = ScoringEngine.calculate_score(product_info, self.reference_additives)
         
         # Create product info object
         processed_product = self._create_product_info(product_info, product_score)
@@ -122,33 +346,31 @@ class ProductAnalyzer:
         off_product = product_data.get("product", product_data)
         
         # Parse weight information
-        weight_str = off_product.get("quantity", "0 g")
         weight_value = 0.0
         weight_unit = "g"
-        
-        # Try to extract numeric value and unit from quantity string
-        import re
-        weight_match = re.match(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]+)", weight_str)
+        weight_match = _WEIGHT_RE.match(off_product.get("quantity", "0 g"))
         if weight_match:
             weight_value = float(weight_match.group(1))
             weight_unit = weight_match.group(2).lower()
-        
-        # Create Weight object
-        from wecare.core.models.schemas import Weight
         weight = Weight(value=weight_value, unit=weight_unit)
         
+        additives_tags = off_product.get("additives_tags", [])
+        
         # Extract ingredients
         ingredients_list = []
         if "ingredients" in off_product:
-            from wecare.core.models.schemas import Ingredient
+            # Lookups below are per ingredient, so build the sets once
+            additive_ids = frozenset(additives_tags)
+            harmful = frozenset(product_data.get("harmful_additives", ()))
+            suspicious = frozenset(product_data.get("suspicious_additives", ()))
             for ing in off_product.get("ingredients", []):
                 # Determine safety classification based on additives lists
                 safety = "safe"
                 ing_id = ing.get("id", "")
-                if ing_id.startswith("en:e") and ing_id in off_product.get("additives_tags", []):
-                    if ing_id in product_data.get("harmful_additives", []):
+                if ing_id.startswith("en:e") and ing_id in additive_ids:
+                    if ing_id in harmful:
                         safety = "harmful"
-                    elif ing_id in product_data.get("suspicious_additives", []):
+                    elif ing_id in suspicious:
                         safety = "suspicious"
                 
                 ingredients_list.append(Ingredient(
@@ -156,36 +378,25 @@ class ProductAnalyzer:
                     safety=safety
                 ))
         
-        # Extract nutrition information
-        nutriments = off_product.get("nutriments", {})
-        
         # Extract additives
-        additives = [
-            additive.replace("en:", "") 
-            for additive in off_product.get("additives_tags", [])
-        ]
+        additives = [additive.removeprefix("en:") for additive in additives_tags]
         
         # Create the nutrition info structure
-        from wecare.core.models.schemas import NutritionInfo, FatInfo, CarbInfo
-        
-        fat_info = FatInfo(
-            total=nutriments.get("fat_100g", nutriments.get("fat", 0)),
-            saturated=nutriments.get("saturated-fat_100g", nutriments.get("saturated-fat", 0))
-        )
-        
-        carb_info = CarbInfo(
-            total=nutriments.get("carbohydrates_100g", nutriments.get("carbohydrates", 0)),
-            sugar=nutriments.get("sugars_100g", nutriments.get("sugars", 0))
-        )
-        
+        nutriments = off_product.get("nutriments", {})
         nutrition = NutritionInfo(
-            calories=nutriments.get("energy-kcal_100g", nutriments.get("energy-kcal", 0)),
-            protein=nutriments.get("proteins_100g", nutriments.get("proteins", 0)),
-            fat=fat_info,
-            carbohydrates=carb_info,
-            fiber=nutriments.get("fiber_100g", nutriments.get("fiber", 0)),
-            salt=nutriments.get("salt_100g", nutriments.get("salt", 0)),
-            sodium=nutriments.get("sodium_100g", nutriments.get("sodium", 0))
+            calories=_per_100g(nutriments, "energy-kcal"),
+            protein=_per_100g(nutriments, "proteins"),
+            fat=FatInfo(
+                total=_per_100g(nutriments, "fat"),
+                saturated=_per_100g(nutriments, "saturated-fat")
+            ),
+            carbohydrates=CarbInfo(
+                total=_per_100g(nutriments, "carbohydrates"),
+                sugar=_per_100g(nutriments, "sugars")
+            ),
+            fiber=_per_100g(nutriments, "fiber"),
+            salt=_per_100g(nutriments, "salt"),
+            sodium=_per_100g(nutriments, "sodium")
         )
         
         # Return the structured ProductInfo object
@@ -216,8 +427,6 @@ class ProductAnalyzer:
         Returns:
             Basic fallback analysis
         """
-        from wecare.core.models.schemas import AllergenAnalysis, DietCompatibility
-        
         logger.warning("Using fallback analysis")
         
         return AIServiceOutput(
@@ -225,13 +434,6 @@ class ProductAnalyzer:
                 detected_allergens=[],
                 user_allergens_present=[]
             ),
-            diet_compatibility=[
-                DietCompatibility(
-                    diet=diet,
-                    compatible=False,
-                    reason="Unable to determine compatibility due to analysis error"
-                )
-                for diet in user_diets
-            ],
+            diet_compatibility=list(_fallback_for(tuple(user_diets))),
             score=None
-        ) 
\ No newline at end of file
+        )
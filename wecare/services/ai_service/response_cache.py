@@ -0,0 +1,166 @@
+"""
+Response cache for the WeCare AI service.
+Keeps recent AI analyses so repeated requests for the same product and user
+preferences do not round-trip to the LLM. Optionally backed by a SQLite file
+so cached analyses survive restarts.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from wecare.core.models.schemas import AIServiceInput, AIServiceOutput
+
+# Compact, key-sorted encoder for cache keys, built once rather than per call
+_KEY_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of AI service outputs keyed by request content.
+
+    With a ``path``, responses are also written to a SQLite file. Misses in
+    memory are looked up there and promoted back into memory on a hit.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 0, path: Optional[str] = None):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of responses kept in memory. A value of 0
+                disables caching.
+            ttl: Seconds a response stays valid. A value of 0 keeps responses
+                until they are evicted.
+            path: Optional SQLite file backing the in-memory entries.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Each entry holds its expiry time on the monotonic clock, or None
+        self._entries: "OrderedDict[bytes, Tuple[Optional[float], AIServiceOutput]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path and maxsize > 0:
+            # Calls are serialized by the lock, so threads may share the connection
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key BLOB PRIMARY KEY, expires REAL, output TEXT NOT NULL)"
+            )
+            # Expiry on disk uses wall-clock time, since it must survive restarts
+            self._db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    @staticmethod
+    def make_key(input_data: AIServiceInput, model: str = "") -> bytes:
+        """Build a cache key from the canonical form of a request.
+
+        Allergens and diets are sorted so that the same preferences given in a
+        different order share an entry.
+
+        Args:
+            input_data: Input data including product info and user preferences.
+            model: Model answering the request, so clients using different
+                models can share a cache.
+
+        Returns:
+            Digest identifying the request.
+        """
+        canonical = _KEY_ENCODER.encode([
+            model,
+            input_data.product_info,
+            sorted(input_data.user_allergens),
+            sorted(input_data.user_diets),
+            input_data.calculate_score
+        ])
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[AIServiceOutput]:
+        """Return a copy of the cached response for a key, if present.
+
+        Args:
+            key: Key returned by ``make_key``.
+
+        Returns:
+            Cached response, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            # Expired entries are dropped lazily, when they are next looked up
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            output = entry[1]
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers get their own copy so they cannot alter the cached entry
+        return output.copy()
+
+    def put(self, key: bytes, output: AIServiceOutput) -> None:
+        """Store a response, evicting the least recently used one if full.
+
+        Args:
+            key: Key returned by ``make_key``.
+            output: Response to cache.
+        """
+        if self.maxsize <= 0:
+            return
+        output = output.copy()
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._remember(key, expires, output)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, time.time() + self.ttl if self.ttl > 0 else None, json.dumps(output.to_dict()))
+                )
+
+    def _remember(self, key: bytes, expires: Optional[float], output: AIServiceOutput) -> None:
+        """Store an entry in memory, evicting the least recently used one if full."""
+        self._entries[key] = (expires, output)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: bytes) -> Optional[Tuple[Optional[float], AIServiceOutput]]:
+        """Promote an unexpired entry from the SQLite file into memory, if present."""
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT expires, output FROM responses WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            output = AIServiceOutput.from_json(row[1])
+        except (ValueError, KeyError, TypeError):
+            # A row this version cannot decode is a miss; the next put replaces it
+            return None
+        expires = time.monotonic() + (row[0] - time.time()) if row[0] is not None else None
+        self._remember(key, expires, output)
+        return self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counts and the number of cached responses."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        """Remove all cached responses and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
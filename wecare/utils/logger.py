@@ -2,15 +2,20 @@
 Logger setup for the WeCare application.
 """
 import logging
-import logging.config
-from typing import Dict, Any
 
-from wecare.config.settings import LOGGING
+from wecare.config.settings import get_settings
 
 
 def setup_logging() -> None:
-    """Configure the logging system based on settings."""
-    logging.config.dictConfig(LOGGING)
+    """Configure the logging system based on settings.
+    
+    The root logger gets a console handler at INFO unless the host has
+    already configured one, whose handlers are then left in place; the
+    ``wecare`` logger only sets its own level, so its records reach them.
+    """
+    settings = get_settings()
+    logging.basicConfig(format=settings.log_format, level=logging.INFO)
+    logging.getLogger("wecare").setLevel(settings.log_level)
     
     
 def get_logger(name: str) -> logging.Logger: